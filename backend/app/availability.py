@@ -0,0 +1,267 @@
+import os
+import threading
+import time
+from bisect import bisect_right, insort
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CALENDAR_TIMEZONE = ZoneInfo('America/Los_Angeles')
+
+AVAILABILITY_TTL = float(os.getenv('AVAILABILITY_TTL', '120'))
+AVAILABILITY_WINDOW_DAYS = int(os.getenv('AVAILABILITY_WINDOW_DAYS', '7'))
+AVAILABILITY_MAX_USERS = int(os.getenv('AVAILABILITY_MAX_USERS', '10000'))
+# Suggested slots stay inside these local working hours
+WORKDAY_START_HOUR = int(os.getenv('WORKDAY_START_HOUR', '8'))
+WORKDAY_END_HOUR = int(os.getenv('WORKDAY_END_HOUR', '18'))
+
+
+def event_interval(event_details):
+    """
+    (start, end) of a parsed event as epoch seconds, or None if the times can't be read.
+    """
+    try:
+        day = datetime.strptime(event_details['date'], '%Y-%m-%d')
+        start = datetime.strptime(event_details['start_time'], '%H:%M')
+        end = datetime.strptime(event_details['end_time'], '%H:%M')
+    except (KeyError, TypeError, ValueError):
+        return None
+    start = day.replace(hour=start.hour, minute=start.minute, tzinfo=CALENDAR_TIMEZONE)
+    end = day.replace(hour=end.hour, minute=end.minute, tzinfo=CALENDAR_TIMEZONE)
+    if end <= start:
+        return None
+    return start.timestamp(), end.timestamp()
+
+
+def rfc3339(timestamp):
+    return datetime.fromtimestamp(timestamp, CALENDAR_TIMEZONE).isoformat()
+
+
+def parse_rfc3339(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+def resource_interval(event):
+    """
+    (start, end) of a Calendar event resource as epoch seconds, or None for all-day events.
+    """
+    times = []
+    for field in ('start', 'end'):
+        value = event.get(field, {})
+        if 'dateTime' not in value:
+            return None
+        moment = datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=ZoneInfo(value['timeZone']) if 'timeZone' in value else CALENDAR_TIMEZONE)
+        times.append(moment.timestamp())
+    return tuple(times)
+
+
+class BusyIndex:
+    """
+    Merged, non-overlapping busy intervals kept as two sorted arrays,
+    so conflict checks are a binary search.
+    """
+    __slots__ = ('starts', 'ends')
+
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+        for start, end in sorted(intervals):
+            self.append_merged(start, end)
+
+    def append_merged(self, start, end):
+        if self.ends and start <= self.ends[-1]:
+            self.ends[-1] = max(self.ends[-1], end)
+        else:
+            self.starts.append(start)
+            self.ends.append(end)
+
+    def add(self, start, end):
+        intervals = list(zip(self.starts, self.ends))
+        insort(intervals, (start, end))
+        self.starts, self.ends = [], []
+        for interval_start, interval_end in intervals:
+            self.append_merged(interval_start, interval_end)
+
+    def conflict(self, start, end, ignore=None):
+        """
+        The first busy interval overlapping [start, end), or None. Busy time
+        inside ignore, e.g. the event being moved, doesn't count.
+        """
+        index = bisect_right(self.ends, start)
+        while index < len(self.starts) and self.starts[index] < end:
+            busy = self.starts[index], self.ends[index]
+            if ignore is None:
+                return busy
+            # What's left of the busy interval outside ignore
+            for part in ((busy[0], min(busy[1], ignore[0])), (max(busy[0], ignore[1]), busy[1])):
+                if part[0] < part[1] and part[0] < end and start < part[1]:
+                    return part
+            index += 1
+        return None
+
+    def next_free_slot(self, start, duration, window_end, ignore=None):
+        """
+        Earliest slot of the given length at or after start, inside working hours.
+        """
+        candidate = start
+        while candidate + duration <= window_end:
+            local = datetime.fromtimestamp(candidate, CALENDAR_TIMEZONE)
+            day_start = local.replace(hour=WORKDAY_START_HOUR, minute=0, second=0, microsecond=0)
+            day_end = local.replace(hour=WORKDAY_END_HOUR, minute=0, second=0, microsecond=0)
+            if local < day_start:
+                candidate = day_start.timestamp()
+                continue
+            if candidate + duration > day_end.timestamp():
+                candidate = (day_start + timedelta(days=1)).timestamp()
+                continue
+
+            busy = self.conflict(candidate, candidate + duration, ignore)
+            if busy is None:
+                return candidate, candidate + duration
+            candidate = busy[1]
+        return None
+
+
+class AvailabilityEntry:
+    """
+    Busy intervals for one user's request window, one index per calendar
+    queried, so a later request only tests the calendars it involves.
+    """
+    __slots__ = ('indexes', 'window_start', 'window_end', 'fetched_at', 'created_ids')
+
+    def __init__(self, indexes, window_start, window_end):
+        self.indexes = indexes
+        self.window_start = window_start
+        self.window_end = window_end
+        self.fetched_at = time.monotonic()
+        self.created_ids = set()
+
+    def busy_index(self, calendars):
+        """
+        One index over the busy times of just these calendars.
+        """
+        if len(calendars) == 1:
+            return self.indexes[next(iter(calendars))]
+        return BusyIndex(
+            interval for calendar_id in calendars
+            for interval in zip(self.indexes[calendar_id].starts, self.indexes[calendar_id].ends)
+        )
+
+
+class CalendarAvailability:
+    """
+    Per-user busy-interval indexes filled by one batched freebusy.query across
+    the user's calendar and the email attendees, cached for a short TTL and
+    updated locally after each insert.
+    """
+    def __init__(self, ttl=AVAILABILITY_TTL, window_days=AVAILABILITY_WINDOW_DAYS, max_users=AVAILABILITY_MAX_USERS):
+        self.ttl = ttl
+        self.window_days = window_days
+        self.max_users = max_users
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'queries': 0}
+
+    def cached_entry(self, user_key, calendars, start, end):
+        entry = self.entries.get(user_key)
+        if (
+            entry is not None
+            and time.monotonic() - entry.fetched_at < self.ttl
+            and calendars <= entry.indexes.keys()
+            and entry.window_start <= start
+            and end <= entry.window_end
+        ):
+            return entry
+        return None
+
+    def entry(self, service, user_key, calendars, start, end):
+        """
+        Return a fresh entry covering [start, end) for these calendars,
+        querying Google only when the cached one doesn't.
+        """
+        calendars = frozenset(calendars)
+        with self.lock:
+            entry = self.cached_entry(user_key, calendars, start, end)
+            if entry is not None:
+                self.stats['hits'] += 1
+                return entry
+
+        # Window from the start of the requested day, long enough to suggest a later slot
+        day = datetime.fromtimestamp(start, CALENDAR_TIMEZONE).replace(hour=0, minute=0, second=0, microsecond=0)
+        window_start = day.timestamp()
+        window_end = max(end, (day + timedelta(days=self.window_days)).timestamp())
+
+        response = service.freebusy().query(body={
+            'timeMin': rfc3339(window_start),
+            'timeMax': rfc3339(window_end),
+            'items': [{'id': calendar_id} for calendar_id in sorted(calendars)],
+        }).execute()
+
+        indexes = {}
+        for calendar_id in calendars:
+            # Calendars Google can't read (e.g. outside the domain) come back with errors and no busy times
+            busy_times = response.get('calendars', {}).get(calendar_id, {}).get('busy', [])
+            indexes[calendar_id] = BusyIndex(
+                (parse_rfc3339(busy['start']), parse_rfc3339(busy['end'])) for busy in busy_times
+            )
+
+        entry = AvailabilityEntry(indexes, window_start, window_end)
+        with self.lock:
+            self.stats['queries'] += 1
+            previous = self.entries.pop(user_key, None)
+            if previous is not None:
+                entry.created_ids = previous.created_ids
+            # Inserted last, so the refreshed user moves to the end of the eviction order
+            self.entries[user_key] = entry
+            if len(self.entries) > self.max_users:
+                # Dicts keep insertion order, so this drops the oldest entry
+                del self.entries[next(iter(self.entries))]
+        return entry
+
+    def find_conflict(self, entry, calendars, start, end, ignore=None):
+        """
+        The earliest busy interval on any of these calendars overlapping [start, end), or None.
+        """
+        with self.lock:
+            conflicts = [entry.indexes[calendar_id].conflict(start, end, ignore) for calendar_id in calendars]
+        return min((busy for busy in conflicts if busy is not None), default=None)
+
+    def suggest_slot(self, entry, calendars, start, end, ignore=None):
+        """
+        Next slot as long as [start, end) that is free on all these calendars,
+        searched within the cached window.
+        """
+        with self.lock:
+            index = entry.busy_index(frozenset(calendars))
+            return index.next_free_slot(start, end - start, entry.window_end, ignore)
+
+    def record_event(self, user_key, start, end, event_id):
+        """
+        Add a just-created event to the cached index so the next check sees it
+        without asking Google again.
+        """
+        with self.lock:
+            entry = self.entries.get(user_key)
+            if entry is not None:
+                if 'primary' in entry.indexes:
+                    entry.indexes['primary'].add(start, end)
+                entry.created_ids.add(event_id)
+
+    def invalidate(self, user_key):
+        """
+        Drop a user's cached index, e.g. after an event moved and its old slot freed up.
+        """
+        with self.lock:
+            self.entries.pop(user_key, None)
+
+    def snapshot(self):
+        with self.lock:
+            return {**self.stats, 'users': len(self.entries)}
+
+
+calendar_availability = CalendarAvailability()
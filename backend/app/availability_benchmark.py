@@ -0,0 +1,101 @@
+import random
+import time
+from datetime import datetime, timedelta
+
+from availability import BusyIndex, CALENDAR_TIMEZONE, CalendarAvailability, event_interval, rfc3339
+from calendar_service import CalendarClientPool
+from fakes import start_fake_calendar
+
+BUSY_INTERVALS = 2_000
+LOOKUPS = 10_000
+
+
+def busy_day(days_ahead=1):
+    return (datetime.now(CALENDAR_TIMEZONE) + timedelta(days=days_ahead)).strftime('%Y-%m-%d')
+
+
+def test_slot_search():
+    """Conflict checks and slot search should stay well under a millisecond"""
+    rng = random.Random(1)
+    now = time.time()
+    intervals = []
+    for _ in range(BUSY_INTERVALS):
+        start = now + rng.randrange(0, 30 * 24 * 3600, 900)
+        intervals.append((start, start + rng.choice([1800, 3600, 5400])))
+    index = BusyIndex(intervals)
+
+    start = time.perf_counter()
+    for _ in range(LOOKUPS):
+        candidate = now + rng.randrange(0, 30 * 24 * 3600, 900)
+        index.conflict(candidate, candidate + 3600)
+        index.next_free_slot(candidate, 3600, now + 31 * 24 * 3600)
+    per_lookup = (time.perf_counter() - start) / LOOKUPS
+
+    print(f"{BUSY_INTERVALS} busy intervals merged to {len(index.starts)}")
+    print(f"Conflict check + slot search: {per_lookup * 1_000_000:.1f} µs")
+    return per_lookup < 0.001
+
+
+def test_cached_queries():
+    """Scheduling several events in one window should query free/busy once"""
+    server, endpoint = start_fake_calendar()
+    pool = CalendarClientPool(api_endpoint=endpoint)
+    availability = CalendarAvailability()
+    day = busy_day()
+
+    try:
+        with pool.lease("bench-token") as service:
+            for hour in range(9, 17):
+                details = {'date': day, 'start_time': f"{hour:02d}:00", 'end_time': f"{hour:02d}:30"}
+                start, end = event_interval(details)
+                entry = availability.entry(service, "bench-user", ['primary'], start, end)
+                if availability.find_conflict(entry, ['primary'], start, end) is None:
+                    availability.record_event("bench-user", start, end, f"event{hour}")
+
+            # 9:00-9:30 is now booked locally, so this must conflict and move to 9:30
+            start, end = event_interval({'date': day, 'start_time': "09:15", 'end_time': "09:45"})
+            entry = availability.entry(service, "bench-user", ['primary'], start, end)
+            conflict = availability.find_conflict(entry, ['primary'], start, end)
+            slot = availability.suggest_slot(entry, ['primary'], start, end)
+    finally:
+        server.shutdown()
+
+    print(f"Free/busy queries for 9 checks: {server.freebusy_queries}")
+    print(f"Suggested slot: {datetime.fromtimestamp(slot[0], CALENDAR_TIMEZONE):%H:%M}")
+    return server.freebusy_queries == 1 and conflict is not None and slot[0] == start + 900
+
+
+def test_attendee_isolation():
+    """An attendee's busy time should only count for requests that invite them"""
+    server, endpoint = start_fake_calendar()
+    pool = CalendarClientPool(api_endpoint=endpoint)
+    availability = CalendarAvailability()
+    start, end = event_interval({'date': busy_day(), 'start_time': "14:00", 'end_time': "15:00"})
+    server.busy['bob@example.com'] = [{'start': rfc3339(start), 'end': rfc3339(end)}]
+
+    try:
+        with pool.lease("bench-token") as service:
+            entry = availability.entry(service, "bench-user", ['primary', 'bob@example.com'], start, end)
+            with_bob = availability.find_conflict(entry, ['primary', 'bob@example.com'], start, end)
+            entry = availability.entry(service, "bench-user", ['primary'], start, end)
+            solo = availability.find_conflict(entry, ['primary'], start, end)
+    finally:
+        server.shutdown()
+
+    print(f"Conflict with Bob invited: {with_bob is not None}, without: {solo is not None}")
+    return with_bob is not None and solo is None
+
+
+if __name__ == "__main__":
+    print("Benchmarking availability checks...")
+    print("-" * 30)
+
+    search_ok = test_slot_search()
+    cache_ok = test_cached_queries()
+    attendees_ok = test_attendee_isolation()
+
+    print("-" * 30)
+    if search_ok and cache_ok and attendees_ok:
+        print("Availability checks are working!")
+    else:
+        print("Availability checks have problems!")
@@ -0,0 +1,248 @@
+"""
+Offline load test for /api/chat.
+
+Runs the FastAPI app under uvicorn against a fake Gemini model and a local
+Calendar server, drives it with mixed chat and scheduling traffic at rising
+concurrency, and writes throughput and latency percentiles to a JSON file.
+
+    python benchmark_suite.py --output bench_results.json --baseline previous.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import uvicorn
+
+import main
+from fakes import FakeGenerativeModel, start_fake_calendar
+
+CHAT_MESSAGES = [
+    "what can you do?",
+    "hi there, how are you?",
+    "how do I get more done this week?",
+    "can you help me plan my day?",
+]
+# The first two hit the rule-based parser; the others need the LLM.
+# The date and hour placeholders spread events out so most of them get inserted.
+SCHEDULING_MESSAGES = [
+    "schedule a meeting with Alex on {date} at {pm_hour}pm",
+    "book a design review meeting on {date} from {am_hour}am to {am_hour}:30am",
+    "schedule a meeting with the team sometime on friday",
+    "set up a 1:1 meeting with Sam next week",
+]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_app(port):
+    server = uvicorn.Server(uvicorn.Config(main.app, host='127.0.0.1', port=port, log_level='warning'))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, thread
+
+
+async def post_json(reader, writer, port, path, payload):
+    """
+    Minimal keep-alive HTTP/1.1 POST; returns the decoded JSON body.
+    """
+    body = json.dumps(payload).encode()
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+
+    status_line = await reader.readline()
+    content_length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode().partition(':')
+        if name.lower() == 'content-length':
+            content_length = int(value)
+    response_body = await reader.readexactly(content_length)
+    if b' 200 ' not in status_line:
+        raise Exception(f"HTTP error: {status_line.decode().strip()}")
+    return json.loads(response_body)
+
+
+def make_message(rng, scheduling, tag, repeat_messages):
+    """
+    Pick a message. Unless repeat_messages is set, messages that would repeat
+    get a unique tag, so chat replies and LLM parses miss the caches and go
+    upstream. Templated ones are left alone for the rule-based parser.
+    """
+    template = rng.choice(SCHEDULING_MESSAGES if scheduling else CHAT_MESSAGES)
+    if '{date}' in template:
+        day = datetime.now() + timedelta(days=rng.randint(1, 28))
+        return template.format(date=f"{day.month}/{day.day}", am_hour=rng.randint(8, 11), pm_hour=rng.randint(1, 4))
+    if repeat_messages:
+        return template
+    return f"{template} (ref {tag})"
+
+
+async def virtual_user(port, level_tag, user_index, requests, scheduling_share, repeat_messages, rng, latencies, failures):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        for request_index in range(requests):
+            tag = f"{level_tag}-{user_index}-{request_index}"
+            message = make_message(rng, rng.random() < scheduling_share, tag, repeat_messages)
+            payload = {
+                'message': message,
+                'access_token': f"bench-token-{level_tag}-{user_index}",
+                'user_id': f"bench-user-{tag}",
+            }
+            start = time.perf_counter()
+            try:
+                data = await post_json(reader, writer, port, '/api/chat', payload)
+                if not data.get('success'):
+                    failures.append(data.get('response'))
+            except Exception as e:
+                failures.append(str(e))
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_level(port, concurrency, requests_per_user, scheduling_share, repeat_messages, seed):
+    latencies = []
+    failures = []
+    rng = random.Random(seed + concurrency)
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        virtual_user(port, concurrency, user, requests_per_user, scheduling_share, repeat_messages,
+                     random.Random(rng.random()), latencies, failures)
+        for user in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': len(failures),
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {level['concurrency']: level for level in json.load(f)['levels']}
+
+    print(f"Compared with {baseline_path}:")
+    for level in results['levels']:
+        previous = baseline.get(level['concurrency'])
+        if previous is None:
+            continue
+        throughput_change = (level['throughput_rps'] / previous['throughput_rps'] - 1) * 100
+        p99_change = (level['p99_ms'] / previous['p99_ms'] - 1) * 100 if previous['p99_ms'] else 0.0
+        print(f"  {level['concurrency']:>3} users: throughput {throughput_change:+.1f}%, p99 {p99_change:+.1f}%")
+
+
+def run_suite(args):
+    calendar_server, calendar_endpoint = start_fake_calendar(latency=args.calendar_latency)
+    main.model = FakeGenerativeModel(latency=args.gemini_latency, jitter=args.gemini_jitter, seed=args.seed)
+    main.calendar_pool.api_endpoint = calendar_endpoint
+    main.logger.setLevel("WARNING")
+
+    port = free_port()
+    server, thread = start_app(port)
+    try:
+        levels = []
+        for concurrency in args.concurrency:
+            level = asyncio.run(run_level(
+                port, concurrency, args.requests_per_user, args.scheduling_share, args.repeat_messages, args.seed,
+            ))
+            levels.append(level)
+            print(f"{concurrency:>3} users: {level['throughput_rps']:7.1f} req/s  "
+                  f"p50 {level['p50_ms']:7.1f} ms  p95 {level['p95_ms']:7.1f} ms  "
+                  f"p99 {level['p99_ms']:7.1f} ms  errors {level['errors']}")
+    finally:
+        server.should_exit = True
+        thread.join()
+        calendar_server.shutdown()
+
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'config': {
+            'gemini_latency': args.gemini_latency,
+            'gemini_jitter': args.gemini_jitter,
+            'calendar_latency': args.calendar_latency,
+            'requests_per_user': args.requests_per_user,
+            'scheduling_share': args.scheduling_share,
+            'repeat_messages': args.repeat_messages,
+            'seed': args.seed,
+        },
+        'gemini_calls': main.model.calls,
+        'calendar_inserts': calendar_server.inserts,
+        'calendar_duplicates': calendar_server.duplicates,
+        'flights_coalesced': main.chat_flights.stats()['coalesced'],
+        'cache_hits': {name: cache.stats()['hits'] for name, cache in (('chat', main.chat_cache), ('parse', main.parse_cache))},
+        'levels': levels,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline load test for /api/chat")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64])
+    parser.add_argument('--requests-per-user', type=int, default=10)
+    parser.add_argument('--scheduling-share', type=float, default=0.5)
+    parser.add_argument('--gemini-latency', type=float, default=0.2)
+    parser.add_argument('--gemini-jitter', type=float, default=0.05)
+    parser.add_argument('--calendar-latency', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat-messages', action='store_true',
+                        help="Reuse a fixed message set, so most replies come from the caches")
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', help="Earlier results file to compare against")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print("Running offline /api/chat benchmark...")
+    print("-" * 30)
+
+    results = run_suite(args)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print("-" * 30)
+    print(f"Results written to {args.output}")
+    if args.baseline:
+        compare(results, args.baseline)
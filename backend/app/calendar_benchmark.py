@@ -0,0 +1,87 @@
+import time
+
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+from calendar_service import CalendarClientPool
+from fakes import start_fake_calendar
+
+REQUESTS = 200
+USERS = 5
+
+EVENT = {
+    'summary': 'Benchmark',
+    'start': {'dateTime': '2025-08-14T14:00:00', 'timeZone': 'America/Los_Angeles'},
+    'end': {'dateTime': '2025-08-14T15:00:00', 'timeZone': 'America/Los_Angeles'},
+}
+
+
+def insert_event(service):
+    return service.events().insert(calendarId='primary', body=EVENT).execute()
+
+
+def run(label, server, insert):
+    server.connections = 0
+    start = time.perf_counter()
+    for i in range(REQUESTS):
+        insert(f"token-{i % USERS}")
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {elapsed / REQUESTS * 1000:6.2f} ms/insert, "
+          f"{server.connections} connections opened")
+    return elapsed
+
+
+def test_calendar_pool(server, endpoint):
+    """Pooled clients should beat building a service per request"""
+    def build_per_request(token):
+        service = build('calendar', 'v3', credentials=Credentials(token),
+                        client_options={'api_endpoint': endpoint})
+        insert_event(service)
+
+    pool = CalendarClientPool(api_endpoint=endpoint)
+
+    def pooled(token):
+        with pool.lease(token) as service:
+            insert_event(service)
+
+    baseline = run("build per request:", server, build_per_request)
+    pooled_time = run("pooled clients:", server, pooled)
+    print(f"Pool stats: {pool.snapshot()}")
+    print(f"Speedup: {baseline / pooled_time:.1f}x")
+    return pooled_time < baseline
+
+
+def test_expired_token(server, endpoint):
+    """A token Google rejects should get an error reply and lose its pooled client"""
+    import main
+
+    main.calendar_pool.api_endpoint = endpoint
+    details = {'date': '2025-08-14', 'start_time': '14:00', 'end_time': '15:00', 'name': 'Benchmark'}
+
+    # Pool a client while the token still works, then revoke it
+    main.create_calendar_event(details, "expiring-token")
+    server.revoked.add("expiring-token")
+    reply, event_id, _ = main.create_calendar_event({**details, 'name': 'Benchmark 2'}, "expiring-token")
+
+    stats = main.calendar_pool.snapshot()
+    print(f"Reply with a revoked token: {reply[:60]}")
+    print(f"Pool after the 401: {stats}")
+    return event_id is None and stats['size'] == 0 and stats['evictions'] == 1
+
+
+if __name__ == "__main__":
+    print("Benchmarking Calendar client pool...")
+    print("-" * 30)
+
+    server, endpoint = start_fake_calendar()
+    faster = test_calendar_pool(server, endpoint)
+    evicted = test_expired_token(server, endpoint)
+    server.shutdown()
+
+    print("-" * 30)
+    if not evicted:
+        print("Expired tokens are not evicted from the pool!")
+    elif faster:
+        print("Pooled Calendar clients are faster!")
+    else:
+        print("Pooled Calendar clients are not faster!")
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Pool settings. Google access tokens live for an hour, so clients are dropped
+# a little before that by default.
+CALENDAR_POOL_SIZE = int(os.getenv('CALENDAR_POOL_SIZE', '256'))
+CALENDAR_CLIENT_TTL = float(os.getenv('CALENDAR_CLIENT_TTL', '3300'))
+CALENDAR_HTTP_TIMEOUT = float(os.getenv('CALENDAR_HTTP_TIMEOUT', '30'))
+
+# Override the Calendar base URL, e.g. "http://127.0.0.1:8080/calendar/v3/" for a local fake
+CALENDAR_API_ENDPOINT = os.getenv('CALENDAR_API_ENDPOINT')
+
+
+@lru_cache(maxsize=1)
+def load_discovery_document():
+    """
+    Load and parse the Calendar v3 discovery document bundled with googleapiclient, once.
+    """
+    from googleapiclient.discovery_cache import get_static_doc
+
+    document = get_static_doc('calendar', 'v3')
+    if document is None:
+        raise Exception("Calendar v3 discovery document is not bundled with googleapiclient")
+    return json.loads(document)
+
+
+def preload():
+    """
+    Import the Calendar client libraries and parse the discovery document
+    ahead of the first request.
+    """
+    import google_auth_httplib2  # noqa: F401
+    from googleapiclient.discovery import build_from_document  # noqa: F401
+
+    load_discovery_document()
+
+
+def token_key(access_token):
+    """
+    Hash the access token so raw tokens are never kept as dict keys.
+    """
+    return hashlib.sha256(access_token.encode()).hexdigest()
+
+
+class PooledClient:
+    """
+    An authorized Calendar service plus the keep-alive connection it owns.
+    """
+    def __init__(self, service, expires_at):
+        self.service = service
+        self.expires_at = expires_at
+        # httplib2 connections are not thread safe, so one caller at a time
+        self.lock = threading.Lock()
+
+
+class CalendarClientPool:
+    """
+    Bounded LRU/TTL pool of authorized Calendar services keyed by token hash.
+    """
+    def __init__(self, max_size=CALENDAR_POOL_SIZE, ttl=CALENDAR_CLIENT_TTL,
+                 api_endpoint=CALENDAR_API_ENDPOINT, http_timeout=CALENDAR_HTTP_TIMEOUT):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.api_endpoint = api_endpoint
+        self.http_timeout = http_timeout
+        self.clients = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    def build_client(self, access_token):
+        # Imported here so the app can start serving before the client libraries load
+        import google_auth_httplib2
+        import httplib2
+        from google.oauth2.credentials import Credentials
+        from googleapiclient.discovery import build_from_document
+
+        creds = Credentials(access_token)
+        # A bare access token can't be refreshed, so let a 401 come back as an
+        # HttpError (and evict the client) rather than a RefreshError
+        http = google_auth_httplib2.AuthorizedHttp(
+            creds, http=httplib2.Http(timeout=self.http_timeout), refresh_status_codes=()
+        )
+        client_options = {'api_endpoint': self.api_endpoint} if self.api_endpoint else None
+        service = build_from_document(
+            load_discovery_document(), http=http, client_options=client_options
+        )
+        return PooledClient(service, time.monotonic() + self.ttl)
+
+    def get(self, access_token):
+        """
+        Return the pooled client for this token, building one on a miss.
+        """
+        key = token_key(access_token)
+        now = time.monotonic()
+
+        with self.lock:
+            client = self.clients.get(key)
+            if client is not None and client.expires_at <= now:
+                del self.clients[key]
+                self.stats['expirations'] += 1
+                client = None
+
+            if client is not None:
+                self.clients.move_to_end(key)
+                self.stats['hits'] += 1
+                return client
+            self.stats['misses'] += 1
+
+        # Build outside the lock so one slow build doesn't stall other users
+        client = self.build_client(access_token)
+
+        with self.lock:
+            # Another thread may have built one meanwhile; keep theirs
+            existing = self.clients.get(key)
+            if existing is not None:
+                self.clients.move_to_end(key)
+                return existing
+
+            self.clients[key] = client
+            while len(self.clients) > self.max_size:
+                self.clients.popitem(last=False)
+                self.stats['evictions'] += 1
+            return client
+
+    @contextmanager
+    def lease(self, access_token):
+        """
+        Borrow the service for one call sequence.
+        """
+        client = self.get(access_token)
+        with client.lock:
+            yield client.service
+
+    def evict(self, access_token):
+        """
+        Drop the client for a token, e.g. after Google rejects it as expired.
+        """
+        with self.lock:
+            if self.clients.pop(token_key(access_token), None) is not None:
+                self.stats['evictions'] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {**self.stats, 'size': len(self.clients)}
+
+
+calendar_pool = CalendarClientPool()
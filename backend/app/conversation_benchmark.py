@@ -0,0 +1,106 @@
+import os
+import tempfile
+import time
+import tracemalloc
+
+from conversation_store import (
+    CONVERSATION_MAX_TURNS, ConversationStore, conversation_turns_table, estimate_tokens, format_history,
+)
+
+SESSIONS = 10_000
+TURNS_PER_SESSION = 6
+USER_TEXT = "schedule a sync with Priya next Monday 2-3pm about the launch plan"
+ASSISTANT_TEXT = "Event created successfully! View it here: https://calendar.google.com/event?eid=abc123"
+
+
+def fill(store):
+    for session in range(SESSIONS):
+        user_key = f"user-{session}"
+        for turn in range(TURNS_PER_SESSION // 2):
+            # Distinct strings per turn, like real traffic
+            store.append(user_key, 'user', f"{USER_TEXT} #{session}-{turn}", True)
+            store.append(user_key, 'assistant', f"{ASSISTANT_TEXT}{session}-{turn}", True)
+
+
+def test_memory_per_session():
+    """Memory for 10k active sessions should stay small and bounded"""
+    store = ConversationStore(max_sessions=SESSIONS, db_url=None)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    fill(store)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    used = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    print(f"{SESSIONS} sessions x {TURNS_PER_SESSION} turns: {used / 1024 / 1024:.1f} MiB "
+          f"({used / SESSIONS:.0f} bytes/session)")
+
+    # Overflowing the limit evicts the least recently used sessions
+    store.append("one-more", 'user', USER_TEXT)
+    print(f"Sessions held after overflow: {len(store.sessions)}")
+    return len(store.sessions) == SESSIONS
+
+
+def test_history_budget():
+    """Prompt history should stay within the token budget however long the chat gets"""
+    store = ConversationStore(db_url=None)
+    for _ in range(100):
+        store.append("long-chat", 'user', USER_TEXT)
+        store.append("long-chat", 'assistant', ASSISTANT_TEXT)
+
+    formatted = format_history(store.history("long-chat"), token_budget=200)
+    print(f"History prompt after 200 messages: {estimate_tokens(formatted)} tokens")
+    # The budget covers the turns; the "messages omitted" note is extra
+    return estimate_tokens(formatted) <= 200 + 10
+
+
+def test_write_behind():
+    """Turns written behind to SQLite should survive a restart"""
+    with tempfile.TemporaryDirectory() as directory:
+        db_url = f"sqlite:///{os.path.join(directory, 'conversations.db')}"
+
+        store = ConversationStore(db_url=db_url, flush_interval=0.05)
+        start = time.perf_counter()
+        for turn in range(1000):
+            store.append("persisted", 'user', f"message {turn}")
+        elapsed = time.perf_counter() - start
+        store.close()
+        print(f"1000 appends with persistence on: {elapsed * 1000:.1f} ms")
+
+        restarted = ConversationStore(db_url=db_url)
+        history = restarted.history("persisted")
+        rows = stored_rows(restarted)
+        restarted.close()
+        print(f"Rows kept for 1000 appends: {rows}")
+
+        # Once the TTL has passed, a restart starts a fresh conversation
+        expired = ConversationStore(db_url=db_url, ttl=0.01)
+        time.sleep(0.02)
+        expired_history = expired.history("persisted")
+        expired.close()
+
+        return (history[-1].text == "message 999" and rows <= CONVERSATION_MAX_TURNS
+                and not expired_history)
+
+
+def stored_rows(store):
+    from sqlalchemy import func, select
+
+    with store.engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(conversation_turns_table())).scalar()
+
+
+if __name__ == "__main__":
+    print("Benchmarking conversation store...")
+    print("-" * 30)
+
+    memory_ok = test_memory_per_session()
+    budget_ok = test_history_budget()
+    persistence_ok = test_write_behind()
+
+    print("-" * 30)
+    if memory_ok and budget_ok and persistence_ok:
+        print("Conversation store is working!")
+    else:
+        print("Conversation store has problems!")
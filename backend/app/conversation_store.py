@@ -0,0 +1,264 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CONVERSATION_MAX_SESSIONS = int(os.getenv('CONVERSATION_MAX_SESSIONS', '10000'))
+CONVERSATION_TTL = float(os.getenv('CONVERSATION_TTL', '3600'))
+CONVERSATION_MAX_TURNS = int(os.getenv('CONVERSATION_MAX_TURNS', '20'))
+HISTORY_TOKEN_BUDGET = int(os.getenv('HISTORY_TOKEN_BUDGET', '1000'))
+
+# Optional write-behind persistence, e.g. "sqlite:///conversations.db"
+CONVERSATION_DB_URL = os.getenv('CONVERSATION_DB_URL')
+CONVERSATION_FLUSH_INTERVAL = float(os.getenv('CONVERSATION_FLUSH_INTERVAL', '2'))
+
+
+@lru_cache(maxsize=1)
+def conversation_turns_table():
+    """
+    Built on first use, so SQLAlchemy is only imported when persistence is on.
+    """
+    from sqlalchemy import Column, Float, Integer, MetaData, String, Table, Text
+
+    return Table(
+        'conversation_turns', MetaData(),
+        Column('id', Integer, primary_key=True),
+        Column('user_key', String(128), index=True, nullable=False),
+        Column('role', String(16), nullable=False),
+        Column('text', Text, nullable=False),
+        Column('scheduling', Integer, nullable=False, default=0),
+        Column('event_id', String(1024)),
+        Column('offer', Text),
+        Column('created_at', Float, nullable=False, index=True),
+    )
+
+
+class Turn:
+    """
+    One message in a conversation. Slots keep 10k+ sessions cheap to hold.
+    """
+    __slots__ = ('role', 'text', 'scheduling', 'event_id', 'offer', 'created_at')
+
+    def __init__(self, role, text, scheduling=False, event_id=None, offer=None, created_at=None):
+        self.role = role
+        self.text = text
+        self.scheduling = scheduling
+        # Calendar event this reply created, so follow-ups can change it
+        self.event_id = event_id
+        # Booking the reply offered after a conflict, so "yes" can confirm it
+        self.offer = offer
+        self.created_at = created_at or time.time()
+
+
+class Session:
+    __slots__ = ('turns', 'last_access')
+
+    def __init__(self, turns=()):
+        self.turns = deque(turns, maxlen=CONVERSATION_MAX_TURNS)
+        self.last_access = time.monotonic()
+
+
+def estimate_tokens(text):
+    """
+    Rough token count (~4 characters per token), good enough for budgeting.
+    """
+    return len(text) // 4 + 1
+
+
+def trim_history(turns, token_budget=HISTORY_TOKEN_BUDGET):
+    """
+    Keep the most recent turns that fit in the token budget.
+    Returns (kept_turns, number_of_dropped_turns).
+    """
+    kept = []
+    used = 0
+    for turn in reversed(turns):
+        # Plus a few tokens for the "User: " / "Assistant: " prefix
+        cost = estimate_tokens(turn.text) + 3
+        if used + cost > token_budget:
+            break
+        kept.append(turn)
+        used += cost
+    kept.reverse()
+    return kept, len(turns) - len(kept)
+
+
+def format_history(turns, token_budget=HISTORY_TOKEN_BUDGET):
+    """
+    Render the conversation so far as prompt text, trimmed to the token budget.
+    """
+    kept, dropped = trim_history(list(turns), token_budget)
+    if not kept:
+        return ""
+
+    lines = []
+    if dropped:
+        lines.append(f"({dropped} earlier messages omitted)")
+    for turn in kept:
+        speaker = "User" if turn.role == 'user' else "Assistant"
+        lines.append(f"{speaker}: {turn.text}")
+    return "\n".join(lines)
+
+
+class ConversationStore:
+    """
+    Per-user conversation history with LRU/TTL eviction in memory and
+    optional write-behind persistence to SQLite through SQLAlchemy.
+    With persistence on, history() and append() may read the database, so
+    async callers should run them on a worker thread (see `blocking`).
+    """
+    def __init__(self, max_sessions=CONVERSATION_MAX_SESSIONS, ttl=CONVERSATION_TTL,
+                 db_url=CONVERSATION_DB_URL, flush_interval=CONVERSATION_FLUSH_INTERVAL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.engine = None
+        self.pending = []
+        # Lock order is always lock -> write_lock -> pending_lock
+        self.write_lock = threading.Lock()
+        self.pending_lock = threading.Lock()
+        self.flush_interval = flush_interval
+        self.stop_event = threading.Event()
+        self.flusher = None
+        self.blocking = bool(db_url)
+        if db_url:
+            from sqlalchemy import create_engine
+
+            self.engine = create_engine(db_url)
+            conversation_turns_table().metadata.create_all(self.engine)
+            self.flusher = threading.Thread(target=self.flush_loop, daemon=True, name='conversation-flush')
+            self.flusher.start()
+
+    def live_session(self, user_key):
+        """
+        Return the user's in-memory session, or None if it is missing or expired.
+        Must be called with self.lock held.
+        """
+        now = time.monotonic()
+        session = self.sessions.get(user_key)
+        if session is not None and now - session.last_access > self.ttl:
+            del self.sessions[user_key]
+            session = None
+
+        if session is not None:
+            self.sessions.move_to_end(user_key)
+            session.last_access = now
+        return session
+
+    def get_session(self, user_key):
+        """
+        Return the live session for a user, loading it from the database on a miss.
+        The database read runs without self.lock, so other users aren't held up.
+        """
+        with self.lock:
+            session = self.live_session(user_key)
+        if session is not None:
+            return session
+
+        turns = self.load_turns(user_key)
+        with self.lock:
+            # Another caller may have loaded it in the meantime
+            session = self.live_session(user_key)
+            if session is None:
+                session = Session(turns)
+                self.sessions[user_key] = session
+                while len(self.sessions) > self.max_sessions:
+                    self.sessions.popitem(last=False)
+            return session
+
+    def history(self, user_key):
+        session = self.get_session(user_key)
+        with self.lock:
+            return list(session.turns)
+
+    def append(self, user_key, role, text, scheduling=False, event_id=None, offer=None):
+        turn = Turn(role, text, scheduling, event_id, offer)
+        session = self.get_session(user_key)
+        with self.lock:
+            session.turns.append(turn)
+            if self.engine is not None:
+                with self.pending_lock:
+                    self.pending.append((user_key, turn))
+
+    def load_turns(self, user_key):
+        if self.engine is None:
+            return []
+
+        from sqlalchemy import select
+
+        # Turns still waiting to be flushed aren't in the database yet
+        self.flush()
+        conversation_turns = conversation_turns_table()
+        # Turns older than the TTL belong to a conversation that has ended
+        query = (
+            select(conversation_turns)
+            .where(conversation_turns.c.user_key == user_key)
+            .where(conversation_turns.c.created_at >= time.time() - self.ttl)
+            .order_by(conversation_turns.c.id.desc())
+            .limit(CONVERSATION_MAX_TURNS)
+        )
+        with self.engine.connect() as connection:
+            rows = connection.execute(query).fetchall()
+        return [
+            Turn(row.role, row.text, bool(row.scheduling), row.event_id,
+                 json.loads(row.offer) if row.offer else None, row.created_at)
+            for row in reversed(rows)
+        ]
+
+    def flush(self):
+        """
+        Write pending turns to the database in one batch, then prune rows past
+        the TTL and beyond CONVERSATION_MAX_TURNS for the users just written.
+        """
+        if self.engine is None:
+            return
+        with self.write_lock:
+            with self.pending_lock:
+                batch, self.pending = self.pending, []
+            if not batch:
+                return
+            rows = [
+                {'user_key': user_key, 'role': turn.role, 'text': turn.text,
+                 'scheduling': int(turn.scheduling), 'event_id': turn.event_id,
+                 'offer': json.dumps(turn.offer) if turn.offer is not None else None, 'created_at': turn.created_at}
+                for user_key, turn in batch
+            ]
+            from sqlalchemy import delete, insert, select
+
+            conversation_turns = conversation_turns_table()
+            with self.engine.begin() as connection:
+                connection.execute(insert(conversation_turns), rows)
+                connection.execute(
+                    delete(conversation_turns).where(conversation_turns.c.created_at < time.time() - self.ttl)
+                )
+                for user_key in {user_key for user_key, _ in batch}:
+                    newest = (
+                        select(conversation_turns.c.id)
+                        .where(conversation_turns.c.user_key == user_key)
+                        .order_by(conversation_turns.c.id.desc())
+                        .limit(CONVERSATION_MAX_TURNS)
+                    )
+                    connection.execute(
+                        delete(conversation_turns)
+                        .where(conversation_turns.c.user_key == user_key)
+                        .where(conversation_turns.c.id.not_in(newest))
+                    )
+
+    def flush_loop(self):
+        while not self.stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        self.stop_event.set()
+        self.flush()
+
+
+conversation_store = ConversationStore()
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from zoneinfo import ZoneInfo
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeStream:
+    """
+    Async iterator of response chunks, like a streamed Gemini reply.
+    """
+    def __init__(self, text, chunk_delay):
+        self.words = text.split(' ')
+        self.chunk_delay = chunk_delay
+
+    async def __aiter__(self):
+        for index, word in enumerate(self.words):
+            await asyncio.sleep(self.chunk_delay)
+            yield FakeResponse(word if index == 0 else ' ' + word)
+
+
+class FakeGenerativeModel:
+    """
+    Stand-in for genai.GenerativeModel with configurable latency and jitter.
+    Scheduling prompts get canned JSON for a working-hours slot in the next
+    four weeks, picked from the prompt so different requests rarely collide.
+    """
+    def __init__(self, latency=0.2, jitter=0.05, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.calls = 0
+
+    def delay(self):
+        return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+    def reply(self, prompt):
+        if "Return JSON" in prompt:
+            slot = zlib.crc32(prompt.encode())
+            day = (datetime.now() + timedelta(days=1 + slot % 28)).strftime("%Y-%m-%d")
+            hour = 9 + slot // 28 % 8
+            return json.dumps({
+                "date": day, "start_time": f"{hour:02d}:00", "end_time": f"{hour + 1:02d}:00",
+                "name": "Team sync", "attendees": ["sam@example.com"],
+            })
+        return "I can help with that! I'll need to know the date, time, and name of the meeting."
+
+    async def generate_content_async(self, prompt, stream=False):
+        self.calls += 1
+        if stream:
+            text = self.reply(prompt)
+            return FakeStream(text, self.delay() / max(len(text.split(' ')), 1))
+        await asyncio.sleep(self.delay())
+        return FakeResponse(self.reply(prompt))
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        time.sleep(self.delay())
+        return FakeResponse(self.reply(prompt))
+
+
+class FakeCalendarHandler(BaseHTTPRequestHandler):
+    """
+    Emulates calendar.events.insert, get, patch and delete and
+    freebusy.query over keep-alive HTTP/1.1. Inserting an ID that already
+    exists returns 409 and deleted events stay behind as cancelled, like
+    Google does. Each access token (Authorization header) gets its own
+    calendar in server.calendars. Busy times come from that calendar plus
+    the preset server.busy intervals, keyed by calendar ID (e.g. an
+    attendee's email). Tokens in server.revoked get 401 on every call, like
+    an expired access token.
+    """
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.stats_lock:
+            self.server.connections += 1
+
+    def rejected(self):
+        """
+        Answer 401 if the caller's token is revoked. Reads the request body
+        first so the keep-alive connection stays usable.
+        """
+        if self.headers.get('Authorization', '').removeprefix('Bearer ') not in self.server.revoked:
+            return False
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_json(401, {'error': {'code': 401, 'message': 'Invalid Credentials'}})
+        return True
+
+    def do_POST(self):
+        if self.rejected():
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.path.split('?')[0].endswith('/freeBusy'):
+            self.freebusy(body)
+        else:
+            self.insert(body)
+
+    def freebusy(self, query):
+        with self.server.stats_lock:
+            self.server.freebusy_queries += 1
+            busy = list(self.server.busy.get('primary', []))
+            for event in self.calendar().values():
+                if event.get('status') == 'cancelled':
+                    continue
+                start = event['start']['dateTime']
+                end = event['end']['dateTime']
+                if 'timeZone' in event['start']:
+                    zone = ZoneInfo(event['start']['timeZone'])
+                    start = datetime.fromisoformat(start).replace(tzinfo=zone).isoformat()
+                    end = datetime.fromisoformat(end).replace(tzinfo=zone).isoformat()
+                busy.append({'start': start, 'end': end})
+            calendars = {
+                item['id']: {'busy': busy if item['id'] == 'primary' else list(self.server.busy.get(item['id'], []))}
+                for item in query.get('items', [])
+            }
+        self.send_json(200, {'kind': 'calendar#freeBusy', 'calendars': calendars})
+
+    def insert(self, event):
+        with self.server.stats_lock:
+            self.server.inserts += 1
+            event_id = event.get('id') or f"fake{self.server.inserts}"
+            if event_id in self.calendar():
+                self.server.duplicates += 1
+                self.send_json(409, {'error': {'code': 409, 'message': 'The requested identifier already exists.'}})
+                return
+            event = {**event, 'id': event_id, 'htmlLink': f'https://calendar.google.com/event?eid={event_id}'}
+            self.calendar()[event_id] = event
+        self.send_json(200, event)
+
+    def calendar(self):
+        """
+        Events of the calling user. Call with server.stats_lock held.
+        """
+        return self.server.calendars.setdefault(self.headers.get('Authorization', ''), {})
+
+    def event_id(self):
+        return self.path.split('?')[0].rstrip('/').rsplit('/', 1)[-1]
+
+    def do_GET(self):
+        if self.rejected():
+            return
+        with self.server.stats_lock:
+            event = self.calendar().get(self.event_id())
+        if event is None:
+            self.send_json(404, {'error': {'code': 404, 'message': 'Not Found'}})
+        else:
+            self.send_json(200, event)
+
+    def do_PATCH(self):
+        if self.rejected():
+            return
+        changes = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        with self.server.stats_lock:
+            event = self.calendar().get(self.event_id())
+            if event is not None:
+                self.server.patches += 1
+                event.update(changes)
+        if event is None:
+            self.send_json(404, {'error': {'code': 404, 'message': 'Not Found'}})
+        else:
+            self.send_json(200, event)
+
+    def do_DELETE(self):
+        if self.rejected():
+            return
+        with self.server.stats_lock:
+            event = self.calendar().get(self.event_id())
+            if event is not None:
+                event['status'] = 'cancelled'
+        if event is None:
+            self.send_json(404, {'error': {'code': 404, 'message': 'Not Found'}})
+        else:
+            self.send_response(204)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_calendar(latency=0.0):
+    """
+    Start a local Calendar stand-in. Returns (server, api_endpoint).
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeCalendarHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.stats_lock = threading.Lock()
+    server.connections = 0
+    server.inserts = 0
+    server.duplicates = 0
+    server.patches = 0
+    server.calendars = {}
+    server.busy = {}
+    server.revoked = set()
+    server.freebusy_queries = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/calendar/v3/"
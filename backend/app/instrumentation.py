@@ -0,0 +1,162 @@
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+
+# Histogram buckets in seconds, from a fast local parse up to a slow Gemini reply
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+logger = logging.getLogger('maxai')
+log_listener = None
+
+
+def setup_logging(level=LOG_LEVEL):
+    """
+    Route log records through a queue so the request path never waits on stdout.
+    """
+    global log_listener
+    if log_listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s %(message)s'))
+
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(log_queue))
+    logger.setLevel(level)
+    logger.propagate = False
+
+    log_listener = QueueListener(log_queue, stream_handler)
+    log_listener.start()
+
+
+def shutdown_logging():
+    global log_listener
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+
+
+class StageMetrics:
+    """
+    Latency histogram, error counter and in-flight gauge for one stage.
+    """
+    __slots__ = ('bucket_counts', 'total', 'count', 'errors', 'in_flight')
+
+    def __init__(self):
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+        self.total = 0.0
+        self.count = 0
+        self.errors = 0
+        self.in_flight = 0
+
+
+class MetricsRegistry:
+    """
+    Per-stage metrics, rendered in the Prometheus text format.
+    Spans run on both the event loop and the calendar threads, hence the lock.
+    """
+    def __init__(self):
+        self.stages = {}
+        self.lock = threading.Lock()
+
+    def stage(self, name):
+        metrics = self.stages.get(name)
+        if metrics is None:
+            metrics = self.stages.setdefault(name, StageMetrics())
+        return metrics
+
+    def start(self, name):
+        with self.lock:
+            self.stage(name).in_flight += 1
+
+    def finish(self, name, duration, failed):
+        index = bisect_left(LATENCY_BUCKETS, duration)
+        with self.lock:
+            metrics = self.stage(name)
+            metrics.in_flight -= 1
+            metrics.count += 1
+            metrics.total += duration
+            if index < len(LATENCY_BUCKETS):
+                metrics.bucket_counts[index] += 1
+            if failed:
+                metrics.errors += 1
+
+    def render(self):
+        with self.lock:
+            snapshot = {
+                name: (list(m.bucket_counts), m.total, m.count, m.errors, m.in_flight)
+                for name, m in sorted(self.stages.items())
+            }
+
+        lines = [
+            '# HELP maxai_stage_duration_seconds Time spent in each request stage.',
+            '# TYPE maxai_stage_duration_seconds histogram',
+        ]
+        for name, (bucket_counts, total, count, _, _) in snapshot.items():
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f'maxai_stage_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'maxai_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {count}')
+            lines.append(f'maxai_stage_duration_seconds_sum{{stage="{name}"}} {total}')
+            lines.append(f'maxai_stage_duration_seconds_count{{stage="{name}"}} {count}')
+
+        lines += [
+            '# HELP maxai_stage_errors_total Stage runs that raised an exception.',
+            '# TYPE maxai_stage_errors_total counter',
+        ]
+        lines += [f'maxai_stage_errors_total{{stage="{name}"}} {values[3]}' for name, values in snapshot.items()]
+
+        lines += [
+            '# HELP maxai_stage_in_flight Stage runs currently in progress.',
+            '# TYPE maxai_stage_in_flight gauge',
+        ]
+        lines += [f'maxai_stage_in_flight{{stage="{name}"}} {values[4]}' for name, values in snapshot.items()]
+        return '\n'.join(lines) + '\n'
+
+
+def render_values(name, help_text, metric_type, values):
+    """
+    Render a labelled family of plain counters or gauges, e.g. cache hit counts.
+    """
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}']
+    for labels, value in values:
+        label_text = ','.join(f'{key}="{label}"' for key, label in labels.items())
+        lines.append(f'{name}{{{label_text}}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+metrics_registry = MetricsRegistry()
+
+
+@contextmanager
+def span(stage):
+    """
+    Time a stage. Works around both sync code and awaits in async code.
+    """
+    metrics_registry.start(stage)
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except Exception:
+        # Not BaseException: a client disconnect (GeneratorExit) or a
+        # cancelled wait isn't a stage failure
+        failed = True
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        metrics_registry.finish(stage, duration, failed)
+        logger.debug("stage=%s duration_ms=%.2f failed=%s", stage, duration * 1000, failed)
@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import main
+from fakes import FakeGenerativeModel
+from main import ChatMessage
+
+# Simulated upstream latencies (seconds)
+GEMINI_LATENCY = 0.2
+CALENDAR_LATENCY = 0.1
+
+CONCURRENCY_LEVELS = [1, 2, 4, 8, 16, 32]
+REQUESTS_PER_CLIENT = 4
+
+
+def fake_create_calendar_event(event_details, access_token, replaces=None, allow_conflict=False):
+    # Blocking on purpose, like the real Calendar client
+    time.sleep(CALENDAR_LATENCY)
+    return "Event created successfully! View it here: https://calendar.google.com/fake", "fake", None
+
+
+async def client(concurrency, index):
+    # A token and chat messages of its own, so clients are neither coalesced
+    # into one flight nor served from each other's cached replies
+    token = f"load-test-{concurrency}-{index}"
+    for request in range(REQUESTS_PER_CLIENT // 2):
+        await main.chat(ChatMessage(message=f"what can you do? ({token}-{request})", access_token=token))
+        await main.chat(ChatMessage(message="schedule a meeting tomorrow at 2pm", access_token=token))
+
+
+async def run_level(concurrency):
+    start = time.perf_counter()
+    await asyncio.gather(*(client(concurrency, index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return concurrency * REQUESTS_PER_CLIENT / elapsed
+
+
+def measure_throughput():
+    """Requests per second at each concurrency level"""
+    main.model = FakeGenerativeModel(latency=GEMINI_LATENCY, jitter=0)
+    main.create_calendar_event = fake_create_calendar_event
+    main.logger.setLevel("WARNING")
+
+    async def run_all():
+        # One event loop for every level, like a single uvicorn worker
+        results = {}
+        for concurrency in CONCURRENCY_LEVELS:
+            results[concurrency] = await run_level(concurrency)
+            print(f"{concurrency:>3} clients: {results[concurrency]:7.1f} req/s")
+        return results
+
+    return asyncio.run(run_all())
+
+
+def scales(results):
+    return results[CONCURRENCY_LEVELS[-1]] > results[1] * 4
+
+
+def test_throughput_scales():
+    """Throughput should grow with the number of concurrent clients"""
+    results = measure_throughput()
+    assert scales(results), f"throughput didn't scale: {results}"
+
+
+if __name__ == "__main__":
+    print("Load testing /api/chat...")
+    print(f"Gemini limit: {main.GEMINI_MAX_CONCURRENCY}, Calendar limit: {main.CALENDAR_MAX_CONCURRENCY}")
+    print("-" * 30)
+
+    results = measure_throughput()
+
+    print("-" * 30)
+    if scales(results):
+        print("Throughput grows with concurrent clients!")
+    else:
+        print("Throughput is flat, something is blocking the event loop!")
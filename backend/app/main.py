@@ -1,18 +1,47 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-import google.generativeai as genai
+import asyncio
+import hashlib
+import json
 import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, asynccontextmanager
 from dotenv import load_dotenv
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from datetime import datetime, timedelta
 from fastapi.middleware.cors import CORSMiddleware
+from calendar_service import calendar_pool, preload as preload_calendar, token_key
+from availability import calendar_availability, event_interval, resource_interval, CALENDAR_TIMEZONE
+from conversation_store import conversation_store, format_history
+from response_cache import cache_key, chat_cache, normalize_message, parse_cache
+from singleflight import SingleFlight
+from instrumentation import logger, metrics_registry, render_values, setup_logging, shutdown_logging, span
+from schedule_parser import FAST_PARSE_MIN_CONFIDENCE, fast_parse_scheduling_request, mentions_when
 
 load_dotenv()
+setup_logging()
 
-app = FastAPI(title="MaxAI Productivity Assistant")
+# Load the Gemini and Calendar client libraries in the background after startup,
+# and only report ready once they are in. Off, they load on the first request.
+PREWARM_ON_STARTUP = os.getenv('PREWARM_ON_STARTUP', 'true').lower() == 'true'
+
+
+@asynccontextmanager
+async def lifespan(app):
+    app.state.ready = not PREWARM_ON_STARTUP
+    prewarm_task = asyncio.create_task(prewarm()) if PREWARM_ON_STARTUP else None
+    yield
+    if prewarm_task is not None:
+        prewarm_task.cancel()
+    # Write any conversation turns still waiting to be persisted
+    conversation_store.close()
+    shutdown_logging()
+
+
+app = FastAPI(title="MaxAI Productivity Assistant", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,9 +51,117 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure Gemini
-genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
-model = genai.GenerativeModel('gemini-1.5-flash')
+# Gemini model, built by get_model() on first use
+model = None
+model_lock = threading.Lock()
+
+
+def get_model():
+    """
+    Configure Gemini and build the model on first use. Importing
+    google.generativeai takes about half a second, so it stays off the
+    import path.
+    """
+    global model
+    if model is None:
+        with model_lock:
+            if model is None:
+                import google.generativeai as genai
+
+                genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+                model = genai.GenerativeModel('gemini-1.5-flash')
+    return model
+
+
+async def load_model():
+    """
+    get_model() for coroutines. The first call imports and configures the
+    SDK, and later callers wait on model_lock, so that runs on a thread.
+    """
+    if model is not None:
+        return model
+    return await asyncio.to_thread(get_model)
+
+
+def warm_clients():
+    get_model()
+    preload_calendar()
+
+
+async def prewarm():
+    """
+    Load the client libraries off the event loop, then report ready. A failure
+    is logged and the clients load on first use instead.
+    """
+    try:
+        with span("prewarm"):
+            await asyncio.to_thread(warm_clients)
+    except Exception:
+        logger.exception("prewarm failed")
+    app.state.ready = True
+    logger.info("ready")
+
+# Upstream concurrency limits. Requests beyond the limit wait in line for up to
+# UPSTREAM_QUEUE_TIMEOUT seconds before giving up.
+GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', '16'))
+CALENDAR_MAX_CONCURRENCY = int(os.getenv('CALENDAR_MAX_CONCURRENCY', '8'))
+UPSTREAM_QUEUE_TIMEOUT = float(os.getenv('UPSTREAM_QUEUE_TIMEOUT', '10'))
+
+gemini_limiter = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+calendar_limiter = asyncio.Semaphore(CALENDAR_MAX_CONCURRENCY)
+
+# The Calendar client is synchronous, so its calls run on their own threads
+calendar_executor = ThreadPoolExecutor(
+    max_workers=CALENDAR_MAX_CONCURRENCY, thread_name_prefix='calendar'
+)
+
+
+class UpstreamBusyError(Exception):
+    """
+    Raised when an upstream service has no free slot within the queue timeout.
+    """
+
+
+@asynccontextmanager
+async def upstream_slot(limiter, upstream_name, queue_stage):
+    """
+    Hold one of the limiter's slots for the duration of an upstream call.
+    Time spent waiting for the slot is recorded under queue_stage.
+    """
+    try:
+        with span(queue_stage):
+            await asyncio.wait_for(limiter.acquire(), timeout=UPSTREAM_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("upstream=%s queue timeout after %ss", upstream_name, UPSTREAM_QUEUE_TIMEOUT)
+        raise UpstreamBusyError(f"{upstream_name} is busy right now, please try again in a moment")
+    try:
+        yield
+    finally:
+        limiter.release()
+
+
+async def generate_content(prompt, stage):
+    """
+    Call Gemini without blocking the event loop.
+    """
+    async with upstream_slot(gemini_limiter, "Gemini", "gemini_queue"):
+        with span(stage):
+            gemini = await load_model()
+            return await gemini.generate_content_async(prompt)
+
+
+async def run_calendar_call(func, *args):
+    """
+    Run a blocking Google Calendar call on the calendar executor.
+    """
+    async with upstream_slot(calendar_limiter, "Google Calendar", "calendar_queue"):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(calendar_executor, func, *args)
+
+
+# Identical chat requests from the same user that arrive while one is still
+# being answered (double clicks, client retries) share that one answer
+chat_flights = SingleFlight()
 
 
 # Data model for incoming messages
@@ -33,9 +170,6 @@ class ChatMessage(BaseModel):
     access_token: str 
     user_id: str = None
 
-# Simple conversation state storage for multi-turn conversations
-conversation_state = {}
-
 # Data model for responses 
 class ChatResponse(BaseModel):
     response: str
@@ -46,61 +180,303 @@ class ChatResponse(BaseModel):
 async def chat(chat_message: ChatMessage):
     user_message = chat_message.message
     access_token = chat_message.access_token
+    user_key = conversation_key(chat_message)
 
-    print("="*100)
-    print("User message: ", user_message)
-    print("="*100)
+    flight_key = chat_flight_key(user_message, access_token, user_key)
+    try:
+        return await chat_flights.run(flight_key, answer_chat, user_message, access_token, user_key)
+    except UpstreamBusyError as e:
+        return ChatResponse(
+            response=str(e),
+            success=False
+        )
+
+def chat_flight_key(user_message, access_token, user_key):
+    """
+    Requests only share a flight when they come with the same token, since the
+    answer may be an event created in that token's calendar.
+    """
+    return cache_key(token_key(access_token), user_key, normalize_message(user_message))
 
-    # Add logic to detect if the user is asking about scheduling a meeting
-    if any(word in user_message.lower() for word in ["schedule", "meeting", "event", "appointment"]):
-        print("DETECTED SCHEDULING REQUEST")
+async def no_progress(event_type, text=""):
+    """
+    Progress callback for callers that only want the final answer.
+    """
 
-        parsed_event = await parse_scheduling_request(user_message)
+async def answer_chat(user_message, access_token, user_key, progress=None):
+    """
+    Answer one chat message and record it in the user's conversation. This is
+    the flow behind both /api/chat and /api/chat/stream: when progress is
+    given it is awaited with each event type and text (see sse_event) as the
+    answer comes together, and a Gemini reply is streamed to it in chunks.
+    """
+    history = await store_call(conversation_store.history, user_key)
+    with span("intent_check"):
+        scheduling = is_scheduling_request(user_message, history)
+    logger.info("chat request scheduling=%s message_chars=%d history_turns=%d",
+                scheduling, len(user_message), len(history))
+
+    chat_response, parsed_event, event_id, offer = await handle_chat(
+        user_message, access_token, history, scheduling, progress
+    )
+    await remember_turn(user_key, user_message, chat_response.response, scheduling, parsed_event, event_id, offer)
+    return chat_response
 
-        print("Parsed event: ", parsed_event)
-        print("Parsed event type: ", type(parsed_event))
+async def handle_chat(user_message, access_token, history, scheduling, progress=None):
+    """
+    Route the message to the scheduling flow or a plain Gemini reply.
+    Returns the response, the parsed event, the ID of the calendar event
+    it created or changed and the booking offered after a conflict, when
+    there are any.
+    """
+    emit = progress or no_progress
+
+    # Add logic to detect if the user is asking about scheduling a meeting
+    if scheduling:
+        accepted = accepted_offer(user_message, history)
+        if accepted is not None:
+            # The user answered the booking we offered after a conflict
+            parsed_event, replaces, allow_conflict = accepted
+        else:
+            await emit("progress", "Parsing your request…")
+            follow_up = is_follow_up(user_message, history)
+            parsed_event = await parse_scheduling_request(user_message, history, follow_up)
+            replaces = history[-1].event_id if follow_up else None
+            allow_conflict = False
 
         if "error" not in parsed_event:
-            print("Parsing successful")
-            # create calendar event
-            print("Creating calendar event...")
-            result = create_calendar_event(parsed_event, access_token)
+            # create calendar event, or move the one the follow-up refers to
+            await emit("progress", "Updating event…" if replaces else "Creating event…")
+            result, event_id, offer = await run_calendar_call(
+                create_calendar_event, parsed_event, access_token, replaces, allow_conflict
+            )
+            await emit("done", result)
 
             return ChatResponse(
                 response=result,
                 success=True
-            )
+            ), parsed_event, event_id, offer
         else:
+            await emit("done", parsed_event["error"])
             return ChatResponse(
                 response=parsed_event["error"],
                 success=True
-            )
+            ), None, None, None
    
-    ai_response = model.generate_content(
-        f""" 
+    key = chat_cache.key(normalize_message(user_message), history_digest(history))
+    cached_response = await chat_cache.get(key)
+    if cached_response is not None:
+        await emit("chunk", cached_response)
+        await emit("done")
+        return ChatResponse(
+            response=cached_response,
+            success=True
+        ), None, None, None
+
+    if progress is None:
+        ai_response = await generate_content(chat_prompt(user_message, history), "gemini_chat")
+        reply = ai_response.text
+    else:
+        chunks = []
+        async with upstream_slot(gemini_limiter, "Gemini", "gemini_queue"):
+            with span("gemini_chat_stream"):
+                gemini = await load_model()
+                response = await gemini.generate_content_async(chat_prompt(user_message, history), stream=True)
+                async for chunk in response:
+                    chunks.append(chunk.text)
+                    await progress("chunk", chunk.text)
+        reply = "".join(chunks)
+    await chat_cache.set(key, reply)
+    await emit("done")
+
+    return ChatResponse(
+        response=reply,
+        success=True
+    ), None, None, None
+
+async def store_call(func, *args):
+    """
+    Run a conversation store call, on a worker thread when persistence is on
+    and it may touch the database.
+    """
+    if conversation_store.blocking:
+        return await asyncio.to_thread(func, *args)
+    return func(*args)
+
+async def remember_turn(user_key, user_message, reply, scheduling, parsed_event=None, event_id=None, offer=None):
+    """
+    Record a finished exchange. Scheduling replies keep the parsed event, the
+    calendar event's ID and any booking offered after a conflict, so the next
+    message can refer back to them.
+    """
+    if parsed_event is not None:
+        reply = f"{reply}\nEvent details: {json.dumps(parsed_event)}"
+    await store_call(conversation_store.append, user_key, 'user', user_message, scheduling)
+    await store_call(conversation_store.append, user_key, 'assistant', reply, scheduling, event_id, offer)
+
+# Streaming Chat Endpoint
+@app.post("/api/chat/stream")
+async def chat_stream(chat_message: ChatMessage):
+    return StreamingResponse(
+        stream_chat_events(chat_message.message, chat_message.access_token, conversation_key(chat_message)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def sse_event(event_type, text=""):
+    """
+    Format one Server-Sent Event. Types are "chunk", "progress", "done" and "error".
+    """
+    return f"data: {json.dumps({'type': event_type, 'text': text})}\n\n"
+
+def stream_chat_events(user_message, access_token, user_key):
+    """
+    Run the answer_chat flow, yielding SSE events as soon as they are ready.
+    Identical streams from the same user share one run and see the same events.
+    """
+    flight_key = chat_flight_key(user_message, access_token, user_key)
+    return aiter(chat_flights.stream(flight_key, produce_chat_events, user_message, access_token, user_key))
+
+async def produce_chat_events(events, user_message, access_token, user_key):
+    """
+    Run one streamed chat and append its SSE events to the shared buffer.
+    """
+    async def progress(event_type, text=""):
+        await events.append(sse_event(event_type, text))
+
+    try:
+        await answer_chat(user_message, access_token, user_key, progress)
+    except UpstreamBusyError as e:
+        await events.append(sse_event("error", str(e)))
+    except Exception as e:
+        logger.exception("streaming chat failed")
+        await events.append(sse_event("error", f"Error generating response: {e}"))
+
+def conversation_key(chat_message):
+    """
+    Identify whose conversation this is. user_id comes from the client and
+    isn't verified, so it only tells apart conversations under the same
+    token; the token hash is always part of the key.
+    """
+    key = token_key(chat_message.access_token)
+    if chat_message.user_id:
+        return cache_key(key, chat_message.user_id)
+    return key
+
+# Follow-ups like "make it 4pm instead" that amend the previous scheduling turn
+FOLLOW_UP_PATTERN = re.compile(r"\b(instead|make it|change it|move it|push it|same (time|day)|actually)\b")
+
+def is_follow_up(user_message, history=()):
+    """
+    Whether the message amends the scheduling request answered just before it.
+    Besides an amend phrase it has to say when, so "actually, what can you
+    do?" stays a plain chat message.
+    """
+    if not history or not history[-1].scheduling:
+        return False
+    lowered = user_message.lower()
+    return bool(FOLLOW_UP_PATTERN.search(lowered)) and (
+        'same time' in lowered or 'same day' in lowered or mentions_when(user_message)
+    )
+
+# Replies to a conflict: take the suggested slot, or keep the requested time
+ACCEPT_PATTERN = re.compile(
+    r"^(?:(?:yes|yeah|yep|sure|ok|okay|please|please do|go ahead|do it|book it|book that|"
+    r"sounds good|that works|thanks|thank you)[\s,.!]*)+$"
+)
+OVERRIDE_PATTERN = re.compile(r"\b(?:book|keep|schedule|do) (?:it|that) (?:anyway|anyways|regardless)\b")
+
+def accepted_offer(user_message, history=()):
+    """
+    (event details, event to replace, allow_conflict) when the message answers
+    the booking offered after a conflict in the previous reply, else None.
+    """
+    if not history or history[-1].offer is None:
+        return None
+    offer = history[-1].offer
+    lowered = user_message.lower().strip()
+    if OVERRIDE_PATTERN.search(lowered):
+        return offer['event'], offer['replaces'], True
+    if offer['suggested'] is not None and ACCEPT_PATTERN.match(lowered):
+        return offer['suggested'], offer['replaces'], False
+    return None
+
+def is_scheduling_request(user_message, history=()):
+    """
+    Cheap keyword check for messages that should go through the scheduling flow.
+    """
+    lowered = user_message.lower()
+    if any(word in lowered for word in ["schedule", "meeting", "event", "appointment"]):
+        return True
+    return is_follow_up(user_message, history) or accepted_offer(user_message, history) is not None
+
+def history_section(history):
+    """
+    Prompt block with the recent conversation, trimmed to HISTORY_TOKEN_BUDGET.
+    """
+    formatted = format_history(history)
+    if not formatted:
+        return ""
+    return f"Conversation so far:\n{formatted}\n"
+
+def history_digest(history):
+    """
+    Fingerprint of the history that goes into a prompt, so cached replies
+    are only reused for the same conversation context.
+    """
+    formatted = format_history(history)
+    return cache_key(formatted) if formatted else ""
+
+def chat_prompt(user_message, history=()):
+    """
+    Build the prompt for a plain (non-scheduling) chat reply.
+    """
+    return f""" 
         You are a helpful assistant that can help with scheduling meetings. 
+        {history_section(history)}
         The user says: {user_message} 
 
         Respond in a friendly and helpful manner. If they ask about scheduling a meeting,
         work, a networking session, or any scheduling related questions, you should respond with a message that says:
         "I can help with that! I'll need to know the date, time, and name of the meeting."
         """
-    )
 
-    return ChatResponse(
-        response=ai_response.text,
-        success=True
-    )
-
-async def parse_scheduling_request(user_message):
+async def parse_scheduling_request(user_message, history=(), follow_up=False):
     """
     Parse the user's message to extract scheduling information.
+    Common phrasings are handled by the local rule-based parser; the LLM is
+    only asked when that parser isn't confident. Follow-ups always go to the
+    LLM, since the rule-based parser doesn't look at the earlier request.
     """
-    # TODO: Implement parsing logic
-
     current_datetime = datetime.now()
+
+    confidence = 0.0
+    if not follow_up:
+        with span("fast_parse"):
+            fast_event, confidence = fast_parse_scheduling_request(user_message, current_datetime)
+        if fast_event is not None and confidence >= FAST_PARSE_MIN_CONFIDENCE:
+            logger.info("parse source=fast_path confidence=%.2f", confidence)
+            return fast_event
+
     current_date = current_datetime.strftime("%Y-%m-%d")
 
+    # The prompt depends on today's date, so it is part of the key. Only a
+    # follow-up is parsed against the conversation; a new request stands on
+    # its own, so earlier turns can't leak into it or split its cache entry.
+    if follow_up:
+        key = parse_cache.key(current_date, normalize_message(user_message), history_digest(history))
+        conversation = f"""
+    The message changes an earlier request (e.g. "make it 4pm instead"), so
+    combine it with the details from the conversation below.
+    {history_section(history)}"""
+    else:
+        key = parse_cache.key(current_date, normalize_message(user_message))
+        conversation = ""
+    cached_event = await parse_cache.get(key)
+    if cached_event is not None:
+        logger.info("parse source=cache")
+        return cached_event
+
     # Tomorrow's date
     tomorrow = current_datetime + timedelta(days=1)
     tomorrow_date = tomorrow.strftime("%Y-%m-%d")
@@ -109,7 +485,7 @@ async def parse_scheduling_request(user_message):
     parse_prompt = f"""
     Parse the following user message to extract scheduling information:
     {user_message}
-
+    {conversation}
     CURRENT DATE: {current_date}
     CURRENT YEAR: {current_datetime.year}
 
@@ -139,94 +515,265 @@ async def parse_scheduling_request(user_message):
     """
 
 
-    response = model.generate_content(parse_prompt)
-    print("Raw AI Response: ", response.text)
+    response = await generate_content(parse_prompt, "gemini_parse")
+    logger.info("parse source=llm confidence=%.2f", confidence)
 
     # Clean the response - extract just the JSON part
     response_text = response.text.strip()
-    print("Cleaned Response: ", response_text)
 
     try:
-        import json
-        # Find the first { and last } to extract just the JSON
-        start = response_text.find('{')
-        end = response_text.rfind('}') + 1
-        
-        if start != -1 and end != -1:
-            json_part = response_text[start:end]
-            print("Extracted JSON: ", json_part)
-
-            parsed_json = json.loads(json_part)
-            print("Successfully parsed JSON")
-            return parsed_json
-        else:
-            return {"error": "No JSON found in response"}
-            
+        with span("json_extraction"):
+            # Find the first { and last } to extract just the JSON
+            start = response_text.find('{')
+            end = response_text.rfind('}') + 1
+
+            if start == -1 or end == 0:
+                return {"error": "No JSON found in response"}
+            parsed_json = json.loads(response_text[start:end])
+
+        await parse_cache.set(key, parsed_json)
+        return parsed_json
+
     except json.JSONDecodeError:
         return {"error": f"AI response wasn't valid JSON: {response_text}"}
 
+@app.get("/ready")
+async def ready():
+    """
+    Readiness probe: 503 until the startup prewarm has finished.
+    """
+    if not getattr(app.state, 'ready', False):
+        return JSONResponse({'ready': False}, status_code=503)
+    return {'ready': True}
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    return {
+        'chat': chat_cache.stats(),
+        'parse': parse_cache.stats(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus scrape endpoint: per-stage latency histograms, error counters and
+    in-flight gauges, plus cache and Calendar pool counters.
+    """
+    cache_values = []
+    for name, cache in (('chat', chat_cache), ('parse', parse_cache)):
+        stats = cache.stats()
+        cache_values += [({'cache': name, 'result': 'hit'}, stats['hits']),
+                         ({'cache': name, 'result': 'miss'}, stats['misses'])]
+
+    availability_stats = calendar_availability.snapshot()
+    availability_values = [({'result': 'cache_hit'}, availability_stats['hits']),
+                           ({'result': 'freebusy_query'}, availability_stats['queries'])]
+
+    pool_stats = calendar_pool.snapshot()
+    pool_values = [({'event': event}, pool_stats[event]) for event in ('hits', 'misses', 'evictions', 'expirations')]
+
+    flight_stats = chat_flights.stats()
+    flight_values = [({'result': 'started'}, flight_stats['started']),
+                     ({'result': 'coalesced'}, flight_stats['coalesced'])]
+
+    return PlainTextResponse(
+        metrics_registry.render()
+        + render_values('maxai_chat_flights_total', 'Chat requests run or coalesced into one in flight.', 'counter', flight_values)
+        + render_values('maxai_cache_lookups_total', 'Response cache lookups.', 'counter', cache_values)
+        + render_values('maxai_availability_lookups_total', 'Busy-interval lookups by source.', 'counter', availability_values)
+        + render_values('maxai_calendar_pool_total', 'Calendar client pool events.', 'counter', pool_values),
+        media_type="text/plain; version=0.0.4",
+    )
+
 def get_calendar_service(access_token):
     """
-    Get a Google Calendar service object using the user's access token.
+    Lease a pooled Google Calendar service for the user's access token.
+    Use it as a context manager: `with get_calendar_service(token) as service:`
     """
     if not access_token:
         raise Exception("Access token is required to get a calendar service")
-    
-    try:
-        creds = Credentials(access_token)
-        service = build('calendar', 'v3', credentials=creds)
-        return service
-    except Exception as e:
-        return {f"Error getting calendar service: {e}"}
 
-def create_calendar_event(event_details, access_token):
+    return calendar_pool.lease(access_token)
+
+def calendar_event_id(event_details, user_key):
+    """
+    Deterministic Calendar event ID for the parsed event, so a retried request
+    maps to the same event instead of creating a duplicate. The request date is
+    included so the same event can still be created again on a later day, and
+    the user so two people booking the same meeting never share an ID.
+    Hex digits are valid in Calendar's base32hex ID alphabet.
+    """
+    fields = [
+        user_key,
+        datetime.now().strftime("%Y-%m-%d"),
+        str(event_details.get('date')),
+        str(event_details.get('start_time')),
+        str(event_details.get('end_time')),
+        str(event_details.get('name', '')).strip().lower(),
+        *sorted(str(attendee).strip().lower() for attendee in event_details.get('attendees') or []),
+    ]
+    return hashlib.sha256('|'.join(fields).encode()).hexdigest()
+
+def describe_slot(start, end):
+    start = datetime.fromtimestamp(start, CALENDAR_TIMEZONE)
+    end = datetime.fromtimestamp(end, CALENDAR_TIMEZONE)
+    return f"{start.strftime('%a %b %d')}, {start.strftime('%H:%M')}–{end.strftime('%H:%M')}"
+
+def conflict_offer(entry, calendars, event_details, interval, replaces=None, ignore=None):
+    """
+    Explain a conflict and suggest the next slot that is free for everyone.
+    Returns the reply and the offer the user can answer: "yes" books the
+    suggested slot, "book it anyway" keeps the requested time.
     """
-    Create a new calendar event using the user's Google Calendar service.
+    with span("slot_search"):
+        slot = calendar_availability.suggest_slot(entry, calendars, *interval, ignore)
+    offer = {'event': event_details, 'suggested': None, 'replaces': replaces}
+    message = f"That time conflicts with something already on the calendar ({describe_slot(*interval)})."
+    if slot is None:
+        message = f"{message} I couldn't find a free slot of the same length in the next few days."
+        return f'{message} Say "book it anyway" to keep this time.', offer
+
+    start = datetime.fromtimestamp(slot[0], CALENDAR_TIMEZONE)
+    end = datetime.fromtimestamp(slot[1], CALENDAR_TIMEZONE)
+    offer['suggested'] = {
+        **event_details,
+        'date': start.strftime("%Y-%m-%d"), 'start_time': start.strftime("%H:%M"), 'end_time': end.strftime("%H:%M"),
+    }
+    message = f"{message} The next free slot is {describe_slot(*slot)}. Want me to book that instead?"
+    return f'{message} Or say "book it anyway" to keep this time.', offer
+
+def fetch_event(service, event_id):
+    """
+    The event with this ID, or None if it doesn't exist.
     """
     try:
-        service = get_calendar_service(access_token)
-        # My parsed data looks like this:
-        # {'date': '2025-08-14', 'start_time': '14:00', 'end_time': '15:00', 'name': 'Meeting with Alex'}
-
-        # Google Calender Event
-        event = { 
-            'summary': event_details['name'],
-            'start': {
-                'dateTime': f"{event_details['date']}T{event_details['start_time']}:00",
-                'timeZone': 'America/Los_Angeles'
-            },
-            'end': {
-                'dateTime': f"{event_details['date']}T{event_details['end_time']}:00",
-                'timeZone': 'America/Los_Angeles'
-            }
-        }
-
-        if event_details.get('attendees'):
-            event['attendees'] = []
-            for attendee in event_details['attendees']: 
-                if '@' in attendee: # email address
-                    event['attendees'].append({'email': attendee})
-                else: # name
-                    event['attendees'].append({'displayName': attendee})
-
-        created_event = service.events().insert(calendarId='primary', body=event).execute()
-        return f"Event created successfully! View it here: {created_event.get('htmlLink')}"
+        return service.events().get(calendarId='primary', eventId=event_id).execute()
+    except HttpError as e:
+        if e.resp.status not in (404, 410):
+            raise
+        return None
 
+def calendar_event_body(event_details):
+    """
+    Google Calendar event resource for the parsed event, without an ID.
+    """
+    # My parsed data looks like this:
+    # {'date': '2025-08-14', 'start_time': '14:00', 'end_time': '15:00', 'name': 'Meeting with Alex'}
+
+    # Google Calender Event
+    event = { 
+        'summary': event_details['name'],
+        'start': {
+            'dateTime': f"{event_details['date']}T{event_details['start_time']}:00",
+            'timeZone': 'America/Los_Angeles'
+        },
+        'end': {
+            'dateTime': f"{event_details['date']}T{event_details['end_time']}:00",
+            'timeZone': 'America/Los_Angeles'
+        }
+    }
+
+    if event_details.get('attendees'):
+        event['attendees'] = []
+        for attendee in event_details['attendees']: 
+            if '@' in attendee: # email address
+                event['attendees'].append({'email': attendee})
+            else: # name
+                event['attendees'].append({'displayName': attendee})
+    return event
+
+def create_calendar_event(event_details, access_token, replaces=None, allow_conflict=False):
+    """
+    Create a new calendar event using the user's Google Calendar service, or
+    move the event `replaces` when the user follows up with a change.
+    Unless allow_conflict is set, checks free/busy for the user and any email
+    attendees first and offers the next free slot on a conflict. Creating the
+    same event twice returns the one that already exists.
+    Returns the reply, the ID of the event now on the calendar and the
+    booking offered on a conflict, each None when there isn't one.
+    """
+    try:
+        user_key = token_key(access_token)
+        event = calendar_event_body(event_details)
+        event_id = replaces or calendar_event_id(event_details, user_key)
+        interval = event_interval(event_details)
+        emails = [attendee['email'] for attendee in event.get('attendees', []) if 'email' in attendee]
+        calendars = ['primary', *emails]
+
+        with ExitStack() as stack:
+            with span("get_calendar_service"):
+                service = stack.enter_context(get_calendar_service(access_token))
+
+            # The event being moved doesn't conflict with its own old slot
+            previous_interval = None
+            if replaces is not None:
+                previous = fetch_event(service, replaces)
+                if previous is None:
+                    # Deleted since, so create it again instead
+                    replaces = None
+                    event_id = calendar_event_id(event_details, user_key)
+                else:
+                    previous_interval = resource_interval(previous)
+
+            entry = None
+            if interval is not None and not allow_conflict:
+                try:
+                    with span("freebusy_query"):
+                        entry = calendar_availability.entry(service, user_key, calendars, *interval)
+                except HttpError as e:
+                    if e.resp.status == 401:
+                        raise
+                    # Availability is a nicety, don't let it block the insert
+                    logger.warning("freebusy query failed status=%s", e.resp.status)
+
+            # Inserts we made ourselves skip the check; a retry ends in the 409 path below
+            if entry is not None and (replaces is not None or event_id not in entry.created_ids):
+                with span("conflict_check"):
+                    busy = calendar_availability.find_conflict(entry, calendars, *interval, previous_interval)
+                if busy is not None:
+                    if replaces is None:
+                        # The busy time may be this very event from an earlier attempt
+                        existing = fetch_event(service, event_id)
+                        if existing is not None and existing.get('status') != 'cancelled':
+                            return f"Event created successfully! View it here: {existing.get('htmlLink')}", event_id, None
+                    message, offer = conflict_offer(entry, calendars, event_details, interval, replaces, previous_interval)
+                    return message, None, offer
+
+            if replaces is not None:
+                with span("calendar_patch"):
+                    # Also restores the event if it was deleted in the meantime
+                    updated_event = service.events().patch(
+                        calendarId='primary', eventId=replaces, body={**event, 'status': 'confirmed'}
+                    ).execute()
+                # Its old slot is free now, so rebuild the index on the next check
+                calendar_availability.invalidate(user_key)
+                return f"Event updated! View it here: {updated_event.get('htmlLink')}", replaces, None
+
+            with span("calendar_insert"):
+                try:
+                    created_event = service.events().insert(calendarId='primary', body={**event, 'id': event_id}).execute()
+                except HttpError as e:
+                    if e.resp.status != 409:
+                        raise
+                    # An earlier attempt already created this event
+                    logger.info("calendar insert deduplicated")
+                    created_event = service.events().get(calendarId='primary', eventId=event_id).execute()
+                    if created_event.get('status') == 'cancelled':
+                        # Deleted since, but Google keeps the ID reserved, so bring it back
+                        created_event = service.events().patch(
+                            calendarId='primary', eventId=event_id, body={**event, 'status': 'confirmed'}
+                        ).execute()
+
+        if interval is not None:
+            calendar_availability.record_event(user_key, *interval, event_id)
+        return f"Event created successfully! View it here: {created_event.get('htmlLink')}", event_id, None
+
+    except HttpError as e:
+        if e.resp.status == 401:
+            # Token expired or revoked, don't keep its client around
+            calendar_pool.evict(access_token)
+        logger.warning("calendar insert failed status=%s", e.resp.status)
+        return f"Error creating calendar event: {e}", None, None
     except Exception as e:
-        return f"Error creating calendar event: {e}"
-
-
-
-
-
-
-
-
-       
-
-
-
-
-
-    
-    
\ No newline at end of file
+        logger.exception("calendar insert failed")
+        return f"Error creating calendar event: {e}", None, None
@@ -0,0 +1,67 @@
+import json
+import os
+import time
+from datetime import datetime
+
+from schedule_parser import FAST_PARSE_MIN_CONFIDENCE, fast_parse_scheduling_request
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'schedule_corpus.json')
+TIMING_ROUNDS = 200
+
+
+def load_corpus():
+    with open(CORPUS_PATH) as f:
+        corpus = json.load(f)
+    return datetime.fromisoformat(corpus['now']), corpus['cases']
+
+
+def matches(parsed, expected):
+    return (
+        parsed['date'] == expected['date']
+        and parsed['start_time'] == expected['start_time']
+        and parsed['end_time'] == expected['end_time']
+        and parsed['name'].lower() == expected['name'].lower()
+        and parsed['attendees'] == expected['attendees']
+    )
+
+
+def test_fast_parser_accuracy():
+    """Served parses must be correct, and most parseable requests should skip the LLM"""
+    now, cases = load_corpus()
+
+    served = correct = 0
+    for case in cases:
+        parsed, confidence = fast_parse_scheduling_request(case['message'], now)
+        if parsed is None or confidence < FAST_PARSE_MIN_CONFIDENCE:
+            continue
+        served += 1
+        if case['expected'] is not None and matches(parsed, case['expected']):
+            correct += 1
+        else:
+            print(f"  wrong: {case['message']!r} -> {parsed}")
+
+    start = time.perf_counter()
+    for _ in range(TIMING_ROUNDS):
+        for case in cases:
+            fast_parse_scheduling_request(case['message'], now)
+    per_parse = (time.perf_counter() - start) / (TIMING_ROUNDS * len(cases))
+
+    accuracy = correct / served if served else 0.0
+    print(f"Corpus size: {len(cases)}")
+    print(f"Served without LLM: {served}/{len(cases)} ({served / len(cases):.0%})")
+    print(f"Accuracy of served parses: {correct}/{served} ({accuracy:.0%})")
+    print(f"Mean parse time: {per_parse * 1e6:.1f} µs")
+    return accuracy >= 0.95
+
+
+if __name__ == "__main__":
+    print("Evaluating fast scheduling parser...")
+    print("-" * 30)
+
+    accurate = test_fast_parser_accuracy()
+
+    print("-" * 30)
+    if accurate:
+        print("Fast parser is accurate!")
+    else:
+        print("Fast parser accuracy is below 95%!")
@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# "memory" (per process) or "sqlite" (shared by every worker on the host)
+RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'memory')
+RESPONSE_CACHE_DB_URL = os.getenv('RESPONSE_CACHE_DB_URL', 'sqlite:///response_cache.db')
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', '3600'))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '5000'))
+
+
+@lru_cache(maxsize=1)
+def cache_entries_table():
+    """
+    Built on first use, so the memory backend never imports SQLAlchemy.
+    """
+    from sqlalchemy import Column, Float, MetaData, String, Table, Text
+
+    return Table(
+        'cache_entries', MetaData(),
+        Column('key', String(64), primary_key=True),
+        Column('value', Text, nullable=False),
+        Column('expires_at', Float, nullable=False),
+        Column('last_used', Float, nullable=False, index=True),
+    )
+
+
+def normalize_message(message):
+    """
+    Collapse case, whitespace and trailing punctuation so near-identical prompts share a key.
+    """
+    return re.sub(r'\s+', ' ', message.lower()).strip(' .!?')
+
+
+def cache_key(*parts):
+    return hashlib.sha256('|'.join(parts).encode()).hexdigest()
+
+
+class MemoryCacheBackend:
+    """
+    In-process LRU with per-entry expiry.
+    """
+    blocking = False
+
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+        # Stored serialized so callers can't mutate a cached value
+        return json.loads(value)
+
+    def set(self, key, value, ttl):
+        value = json.dumps(value)
+        with self.lock:
+            self.entries[key] = (value, time.time() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def size(self):
+        return len(self.entries)
+
+
+class SQLiteCacheBackend:
+    """
+    Cache in a local SQLite file so every worker on the host shares it.
+    """
+    blocking = True
+
+    def __init__(self, db_url=RESPONSE_CACHE_DB_URL, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        from sqlalchemy import create_engine
+
+        self.max_entries = max_entries
+        self.engine = create_engine(db_url, connect_args={'timeout': 5})
+        cache_entries_table().metadata.create_all(self.engine)
+
+    def get(self, key):
+        from sqlalchemy import delete, select, update
+
+        cache_entries = cache_entries_table()
+        now = time.time()
+        with self.engine.begin() as connection:
+            row = connection.execute(
+                select(cache_entries.c.value, cache_entries.c.expires_at).where(cache_entries.c.key == key)
+            ).first()
+            if row is None:
+                return None
+            if row.expires_at <= now:
+                connection.execute(delete(cache_entries).where(cache_entries.c.key == key))
+                return None
+            connection.execute(
+                update(cache_entries).where(cache_entries.c.key == key).values(last_used=now)
+            )
+            return json.loads(row.value)
+
+    def set(self, key, value, ttl):
+        from sqlalchemy import delete, func, select
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+        cache_entries = cache_entries_table()
+        now = time.time()
+        statement = sqlite_insert(cache_entries).values(
+            key=key, value=json.dumps(value), expires_at=now + ttl, last_used=now
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=['key'],
+            set_={'value': statement.excluded.value, 'expires_at': statement.excluded.expires_at,
+                  'last_used': statement.excluded.last_used},
+        )
+        with self.engine.begin() as connection:
+            connection.execute(statement)
+            count = connection.execute(select(func.count()).select_from(cache_entries)).scalar()
+            if count > self.max_entries:
+                # Drop expired entries first, then the least recently used
+                connection.execute(delete(cache_entries).where(cache_entries.c.expires_at <= now))
+                oldest = (
+                    select(cache_entries.c.key)
+                    .order_by(cache_entries.c.last_used)
+                    .limit(max(count - self.max_entries, 0))
+                )
+                connection.execute(delete(cache_entries).where(cache_entries.c.key.in_(oldest)))
+
+    def size(self):
+        from sqlalchemy import func, select
+
+        cache_entries = cache_entries_table()
+        with self.engine.connect() as connection:
+            return connection.execute(select(func.count()).select_from(cache_entries)).scalar()
+
+
+def make_backend(name=RESPONSE_CACHE_BACKEND):
+    if name == 'memory':
+        return MemoryCacheBackend()
+    if name == 'sqlite':
+        return SQLiteCacheBackend()
+    raise Exception(f"Unknown response cache backend: {name}")
+
+
+class ResponseCache:
+    """
+    Namespaced cache in front of a model call site, with hit-rate counters.
+    """
+    def __init__(self, namespace, backend, ttl=RESPONSE_CACHE_TTL):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, *parts):
+        return cache_key(self.namespace, *parts)
+
+    async def get(self, key):
+        if self.backend.blocking:
+            value = await asyncio.to_thread(self.backend.get, key)
+        else:
+            value = self.backend.get(key)
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key, value):
+        if self.backend.blocking:
+            await asyncio.to_thread(self.backend.set, key, value, self.ttl)
+        else:
+            self.backend.set(key, value, self.ttl)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+cache_backend = make_backend()
+chat_cache = ResponseCache('chat', cache_backend)
+parse_cache = ResponseCache('parse', cache_backend)
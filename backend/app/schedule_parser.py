@@ -0,0 +1,337 @@
+import os
+import re
+from datetime import datetime, timedelta
+
+# Parses below this confidence are handed to the LLM instead
+FAST_PARSE_MIN_CONFIDENCE = float(os.getenv('FAST_PARSE_MIN_CONFIDENCE', '0.7'))
+
+DEFAULT_DURATION_MINUTES = 60
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+WEEKDAYS = {
+    'mon': 0, 'tue': 1, 'wed': 2, 'thu': 3, 'fri': 4, 'sat': 5, 'sun': 6,
+}
+NUMBER_WORDS = {'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5}
+
+MONTH_NAME = r'(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)(?:uary|ruary|ch|il|e|y|ust|t|tember|ober|ember)?\.?'
+WEEKDAY_NAME = r'(mon|tue|wed|thu|fri|sat|sun)(?:day|s|sday|nesday|r|rs|rsday|urday)?'
+ORDINAL = r'(?:st|nd|rd|th)?'
+
+DATE_PATTERNS = [
+    ('iso', re.compile(r'\b(?:on\s+)?(\d{4})-(\d{1,2})-(\d{1,2})\b')),
+    ('slash', re.compile(r'\b(?:on\s+)?(\d{1,2})/(\d{1,2})(?:/(\d{4}|\d{2}))?\b')),
+    ('month_day', re.compile(r'\b(?:on\s+)?' + MONTH_NAME + r'\s+(\d{1,2})' + ORDINAL + r'(?:,?\s+(\d{4}))?\b')),
+    ('day_month', re.compile(r'\b(?:on\s+)?(?:the\s+)?(\d{1,2})' + ORDINAL + r'\s+(?:of\s+)?' + MONTH_NAME + r'(?:,?\s+(\d{4}))?\b')),
+    ('day_after_tomorrow', re.compile(r'\b(?:the\s+)?day after (?:tomorrow|tmrw)\b')),
+    ('tomorrow', re.compile(r'\b(?:tomorrow|tmrw|tmr)\b')),
+    ('today', re.compile(r'\b(?:today|tonight)\b')),
+    ('in_days', re.compile(r'\bin\s+(\d+|a|an|one|two|three|four|five)\s+(day|week)s?\b')),
+    ('weekday', re.compile(r'\b(?:on\s+)?(?:(this|next|coming|this coming)\s+)?' + WEEKDAY_NAME + r'\b')),
+]
+
+# A clock time: "3", "3pm", "3:30 pm", "15:00", "noon"
+TIME = r'(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?'
+RANGE_PATTERN = re.compile(
+    r'\b(?:(?:from|between|at)\s+)?' + TIME + r'\s*(?:-|–|to|until|till|and)\s*' + TIME + r'(?![\w/])'
+)
+TIME_PATTERN = re.compile(r'(?:(\bat|@)\s*)?\b' + TIME + r'(?![\w/:])')
+NAMED_TIME_PATTERN = re.compile(r'\b(?:at\s+)?(noon|midday|midnight)\b')
+
+DURATION_PATTERN = re.compile(
+    r'\b(?:for\s+)?(?:(\d+(?:\.\d+)?|an?|one|two|three|half an?|half)\s*)'
+    r'(hours?|hrs?|h|minutes?|mins?|m)\b(?:\s+and\s+a\s+half)?'
+)
+
+# Phrases the rules can't resolve reliably; these go to the LLM
+VAGUE_PATTERN = re.compile(
+    r'\b(next week|this week|morning|afternoon|evening|sometime|every|weekly|daily|'
+    r'monthly|recurring|each|asap|later|ish|or|reschedule|move|cancel|instead|change|'
+    r'before|after|around)\b'
+)
+
+LEADING_FILLER = re.compile(
+    r'^(?:(?:hey|hi|ok|okay|please|pls|can you|could you|would you|i need to|i want to|'
+    r'i\'d like to|let\'s|lets|help me)\s+)*'
+    r'(?:(?:schedule|book|set up|setup|add|create|put|plan|arrange|make)\s+)?'
+    r'(?:me\s+)?(?:(?:a|an|the|my)\s+)?',
+    re.IGNORECASE,
+)
+TRAILING_FILLER = re.compile(
+    r'\s+(?:for me|on my calendar|to my calendar|in my calendar|please|pls|thanks|thank you)\s*$',
+    re.IGNORECASE,
+)
+DANGLING_WORD = re.compile(r'(?:^|\s)(?:at|on|from|for|by|to|and|between|@)\s*$', re.IGNORECASE)
+ATTENDEES_PATTERN = re.compile(
+    r'\bwith\s+(.+?)(?=\s+(?:about|to discuss|regarding|re:)\b|[?!;]|\.(?!\w)|$)'
+)
+EMAIL_PATTERN = re.compile(r'^[\w.+-]+@[\w-]+(?:\.[\w-]+)+$')
+
+
+def number_value(text):
+    text = text.strip()
+    if text in NUMBER_WORDS:
+        return NUMBER_WORDS[text]
+    return float(text)
+
+
+def mask(text, start, end):
+    """
+    Blank out a matched span while keeping every other offset unchanged.
+    """
+    return text[:start] + ' ' * (end - start) + text[end:]
+
+
+def find_dates(lower, today):
+    """
+    Return (date, start, end) for every date expression in the message.
+    """
+    found = []
+    masked = lower
+    for kind, pattern in DATE_PATTERNS:
+        for match in pattern.finditer(masked):
+            value = resolve_date(kind, match, today)
+            if value is None:
+                continue
+            found.append((value, match.start(), match.end()))
+        for _, start, end in found:
+            masked = mask(masked, start, end)
+    return found
+
+
+def resolve_date(kind, match, today):
+    try:
+        if kind == 'iso':
+            year, month, day = (int(g) for g in match.groups())
+            return today.replace(year=year, month=month, day=day)
+        if kind == 'slash':
+            month, day, year = match.groups()
+            year = int(year) if year else today.year
+            if year < 100:
+                year += 2000
+            return today.replace(year=year, month=int(month), day=int(day))
+        if kind == 'month_day':
+            month, day, year = match.groups()
+            return today.replace(year=int(year) if year else today.year, month=MONTHS[month], day=int(day))
+        if kind == 'day_month':
+            day, month, year = match.groups()
+            return today.replace(year=int(year) if year else today.year, month=MONTHS[month], day=int(day))
+    except ValueError:
+        # e.g. 2/30
+        return None
+
+    if kind == 'day_after_tomorrow':
+        return today + timedelta(days=2)
+    if kind == 'tomorrow':
+        return today + timedelta(days=1)
+    if kind == 'today':
+        return today
+    if kind == 'in_days':
+        count, unit = match.groups()
+        days = int(number_value(count)) * (7 if unit == 'week' else 1)
+        return today + timedelta(days=days)
+    if kind == 'weekday':
+        modifier, weekday = match.groups()
+        weekday = WEEKDAYS[weekday]
+        if modifier == 'next':
+            # "next Monday" → that day in next week
+            start_of_next_week = today - timedelta(days=today.weekday()) + timedelta(days=7)
+            return start_of_next_week + timedelta(days=weekday)
+        # "Friday" / "this Friday" → the coming Friday, never today
+        days_ahead = (weekday - today.weekday()) % 7 or 7
+        return today + timedelta(days=days_ahead)
+    return None
+
+
+def to_minutes(hour, minute, meridiem):
+    hour = int(hour)
+    minute = int(minute or 0)
+    if hour > 23 or minute > 59:
+        return None
+    if meridiem:
+        if hour > 12 or hour == 0:
+            return None
+        if meridiem.startswith('p') and hour != 12:
+            hour += 12
+        elif meridiem.startswith('a') and hour == 12:
+            hour = 0
+    return hour * 60 + minute
+
+
+def guess_meridiem(hour):
+    """
+    Office-hours guess for a bare hour: 8–11 are mornings, 12–7 afternoons.
+    """
+    return 'am' if 8 <= hour <= 11 else 'pm'
+
+
+def find_times(lower):
+    """
+    Return (start_minutes, end_minutes or None, span, confident) for the first time expression.
+    """
+    match = RANGE_PATTERN.search(lower)
+    if match:
+        h1, m1, mer1, h2, m2, mer2 = match.groups()
+        explicit = mer1 or mer2 or m1 or m2 or int(h1) > 12
+        if explicit or match.group(0).startswith(('from', 'between', 'at')):
+            confident = bool(explicit)
+            if not mer1 and not mer2 and not m1 and not m2 and int(h1) <= 12 and int(h2) <= 12:
+                # "from 9 to 5" → 9am to 5pm
+                mer1, mer2 = guess_meridiem(int(h1)), guess_meridiem(int(h2))
+            if int(h1) > 12 or int(h2) > 12:
+                mer1 = mer2 = None
+            end = to_minutes(h2, m2, mer2 or mer1)
+            start = to_minutes(h1, m1, mer1 or mer2)
+            if start is not None and end is not None:
+                if start >= end and not mer1 and mer2:
+                    # "11-1pm" → 11am to 1pm
+                    start = to_minutes(h1, m1, 'am')
+                if end <= start and not mer2 and mer1 and int(h2) <= 12:
+                    # "10am-12" → 10am to 12pm
+                    end = to_minutes(h2, m2, 'pm' if mer1.startswith('a') else 'am')
+                if start is not None and end is not None and start < end:
+                    return start, end, (match.start(), match.end()), confident
+
+    match = NAMED_TIME_PATTERN.search(lower)
+    if match:
+        start = 0 if match.group(1) == 'midnight' else 12 * 60
+        return start, None, (match.start(), match.end()), True
+
+    for match in TIME_PATTERN.finditer(lower):
+        prefix, hour, minute, meridiem = match.groups()
+        if not (prefix or meridiem or minute):
+            # A bare number is only a time when introduced by "at"
+            continue
+        confident = bool(meridiem or minute)
+        if not meridiem and not minute and int(hour) <= 12:
+            meridiem = guess_meridiem(int(hour))
+        if not meridiem and minute and 1 <= int(hour) <= 7:
+            # "at 3:30" almost always means the afternoon
+            meridiem = 'pm'
+        start = to_minutes(hour, minute, meridiem)
+        if start is not None:
+            return start, None, (match.start(), match.end()), confident
+    return None
+
+
+def find_duration(lower):
+    for match in DURATION_PATTERN.finditer(lower):
+        amount, unit = match.groups()
+        # A bare "m" or "h" is only a duration when it follows a number
+        if unit in ('m', 'h') and not amount[0].isdigit():
+            continue
+        value = 0.5 if amount.startswith('half') else number_value(amount)
+        if match.group(0).endswith('and a half'):
+            value += 0.5
+        minutes = value * 60 if unit.startswith('h') else value
+        return int(minutes), (match.start(), match.end())
+    return None
+
+
+def extract_attendees(text):
+    match = ATTENDEES_PATTERN.search(text)
+    if not match:
+        return []
+    attendees = []
+    for part in re.split(r',|\s+and\s+|\s*&\s*', match.group(1)):
+        part = part.strip()
+        if EMAIL_PATTERN.match(part) or (part and part[0].isupper()):
+            attendees.append(part)
+    return attendees
+
+
+def clean_name(text):
+    name = re.sub(r'\s+', ' ', text).strip(' ,.-!?')
+    titled = re.search(r'\b(?:called|named|titled)\s+(.+)', name, re.IGNORECASE)
+    if titled:
+        name = titled.group(1).strip(' "\'')
+    previous = None
+    while name != previous:
+        previous = name
+        name = LEADING_FILLER.sub('', name).strip(' ,.-!?')
+        name = TRAILING_FILLER.sub('', name).strip(' ,.-!?')
+        name = DANGLING_WORD.sub('', name).strip(' ,.-!?')
+        name = re.sub(r'^(?:at|on|from|for|by|to|and|@)\s+', '', name, flags=re.IGNORECASE)
+    name = re.sub(r'\s+(?:at|on|for|from)\s+(?=(?:at|on|for|from)\b)', ' ', name)
+    if not name:
+        return 'Meeting'
+    return name[0].upper() + name[1:]
+
+
+# Vague on their own, but still say when the event should be
+WHEN_WORDS_PATTERN = re.compile(r'\b(morning|afternoon|evening|next week|this week|weekend)\b')
+
+
+def mentions_when(user_message, now=None):
+    """
+    Whether the message names a date, time, duration or part of the day.
+    """
+    now = now or datetime.now()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    lower = user_message.lower()
+    return bool(
+        find_dates(lower, today) or find_times(lower) or find_duration(lower)
+        or WHEN_WORDS_PATTERN.search(lower)
+    )
+
+
+def fast_parse_scheduling_request(user_message, now=None):
+    """
+    Rule-based extraction of {date, start_time, end_time, name, attendees}.
+
+    Returns (parsed_event, confidence). The event is None when the message has
+    no usable date and time; confidence is in [0, 1].
+    """
+    now = now or datetime.now()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    lower = user_message.lower()
+
+    dates = find_dates(lower, today)
+    if len(dates) != 1:
+        return None, 0.0
+    date, start, end = dates[0]
+    working = mask(user_message, start, end)
+    working_lower = working.lower()
+
+    if VAGUE_PATTERN.search(working_lower):
+        return None, 0.0
+
+    times = find_times(working_lower)
+    if times is None:
+        return None, 0.0
+    start_minutes, end_minutes, (start, end), confident_time = times
+    working = mask(working, start, end)
+    working_lower = working.lower()
+
+    confidence = 1.0 if confident_time else 0.8
+
+    duration = find_duration(working_lower)
+    if duration is not None:
+        minutes, (start, end) = duration
+        working = mask(working, start, end)
+        if end_minutes is None:
+            end_minutes = start_minutes + minutes
+    if end_minutes is None:
+        end_minutes = start_minutes + DEFAULT_DURATION_MINUTES
+    if end_minutes > 24 * 60:
+        # Crosses midnight; let the model sort it out
+        return None, 0.0
+
+    # Leftover digits mean something we didn't understand
+    if re.search(r'\d', re.sub(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+', '', working)):
+        confidence -= 0.4
+
+    name = clean_name(working)
+    if len(name) > 60:
+        confidence -= 0.4
+
+    parsed_event = {
+        'date': date.strftime('%Y-%m-%d'),
+        'start_time': f"{start_minutes // 60:02d}:{start_minutes % 60:02d}",
+        'end_time': f"{end_minutes // 60:02d}:{end_minutes % 60:02d}",
+        'name': name,
+        'attendees': extract_attendees(working),
+    }
+    return parsed_event, round(confidence, 2)
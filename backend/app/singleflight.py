@@ -0,0 +1,95 @@
+import asyncio
+
+
+class ReplayBuffer:
+    """
+    Items produced by one run, replayed in order to every reader, including
+    readers that start after some items were already produced.
+    """
+    def __init__(self):
+        self.items = []
+        self.closed = False
+        self.condition = asyncio.Condition()
+
+    async def append(self, item):
+        async with self.condition:
+            self.items.append(item)
+            self.condition.notify_all()
+
+    async def close(self):
+        async with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    async def __aiter__(self):
+        index = 0
+        while True:
+            async with self.condition:
+                await self.condition.wait_for(lambda: index < len(self.items) or self.closed)
+                pending = self.items[index:]
+                closed = self.closed
+            for item in pending:
+                yield item
+            index += len(pending)
+            if closed and index >= len(self.items):
+                return
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one shared run.
+
+    The first caller starts the work; callers arriving while it is in flight
+    await the same result instead of repeating it. The run is shielded, so a
+    disconnecting caller doesn't cancel it for the others.
+    """
+    def __init__(self):
+        self.flights = {}
+        self.streams = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def run(self, key, func, *args):
+        flight = self.flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(flight)
+
+        flight = asyncio.ensure_future(func(*args))
+        self.flights[key] = flight
+        self.started += 1
+        flight.add_done_callback(lambda _: self.flights.pop(key, None))
+        return await asyncio.shield(flight)
+
+    def stream(self, key, produce, *args):
+        """
+        Like run, for work that emits results as it goes. produce(buffer, *args)
+        appends to a ReplayBuffer, and every caller with the same key reads
+        that buffer from the start. The run isn't tied to any one reader, so
+        it finishes even if they all go away.
+        """
+        flight = self.streams.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            return flight[0]
+
+        async def run():
+            try:
+                await produce(buffer, *args)
+            finally:
+                await buffer.close()
+
+        buffer = ReplayBuffer()
+        task = asyncio.ensure_future(run())
+        # Readers only hold the buffer, so keep the task referenced here until it's done
+        self.streams[key] = (buffer, task)
+        self.started += 1
+        task.add_done_callback(lambda _: self.streams.pop(key, None))
+        return buffer
+
+    def stats(self):
+        return {
+            'started': self.started,
+            'coalesced': self.coalesced,
+            'in_flight': len(self.flights) + len(self.streams),
+        }
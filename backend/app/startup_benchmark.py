@@ -0,0 +1,209 @@
+"""
+Cold-start benchmark for the API.
+
+Reports `python -X importtime` numbers for `import main`, the RSS after
+import and after prewarm, and how long a fresh uvicorn process takes to
+accept connections and to pass /ready. Results go to a JSON file so
+regressions can be compared across commits.
+
+    python startup_benchmark.py --output startup_results.json --baseline previous.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+
+from benchmark_suite import free_port, git_commit
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Runs in a fresh interpreter so nothing is imported yet
+MEASURE_IMPORT = """
+import json, sys, time
+try:
+    import resource
+except ImportError:
+    # Windows has no resource module, so RSS is reported as null there
+    resource = None
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+import_rss = peak_rss_kb()
+main.warm_clients()
+warmed = time.perf_counter()
+print(json.dumps({
+    'import_s': imported - start,
+    'prewarm_s': warmed - imported,
+    'import_rss_kb': import_rss,
+    'prewarm_rss_kb': peak_rss_kb(),
+}))
+"""
+
+
+def run_python(*args):
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, cwd=APP_DIR, check=True,
+    )
+
+
+def import_times(top):
+    """
+    Parse `-X importtime` output: total time for main and its slowest top-level imports.
+    """
+    stderr = run_python('-X', 'importtime', '-c', 'import main').stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        # Nesting shows as two extra spaces per level before the name
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        modules.append((name.strip(), depth, int(cumulative_us)))
+
+    total = next(cumulative for name, depth, cumulative in modules if name == 'main' and depth == 0)
+    children = sorted(
+        (module for module in modules if module[1] == 1), key=lambda module: module[2], reverse=True,
+    )
+    return {
+        'main_import_ms': round(total / 1000, 1),
+        'slowest_imports': [
+            {'module': name, 'cumulative_ms': round(cumulative / 1000, 1)}
+            for name, _, cumulative in children[:top]
+        ],
+    }
+
+
+def process_rss_kb(pid):
+    """
+    Current RSS of a child process from /proc, or None where there is no /proc.
+    """
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def time_to_ready(timeout):
+    """
+    Start uvicorn and poll /ready. Returns seconds to the first answer,
+    seconds to ready, and the server's RSS once ready.
+    """
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=APP_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    accepting = None
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/ready', timeout=1):
+                    ready = time.perf_counter() - start
+                    return accepting or ready, ready, process_rss_kb(server.pid)
+            except urllib.error.HTTPError:
+                # 503 while the prewarm is still running
+                accepting = accepting or time.perf_counter() - start
+            except OSError:
+                pass
+            time.sleep(0.01)
+        raise Exception(f"Server wasn't ready after {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def megabytes(kilobytes):
+    return kilobytes / 1024 if kilobytes is not None else None
+
+
+def format_mb(megabytes):
+    return f"{megabytes:.1f} MB" if megabytes is not None else "n/a"
+
+
+def median(values):
+    values = [value for value in values if value is not None]
+    return round(statistics.median(values), 3) if values else None
+
+
+def run_benchmark(args):
+    imports = [json.loads(run_python('-c', MEASURE_IMPORT).stdout) for _ in range(args.runs)]
+    servers = [time_to_ready(args.timeout) for _ in range(args.runs)]
+
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'runs': args.runs,
+        **import_times(args.top),
+        'import_s': median(run['import_s'] for run in imports),
+        'prewarm_s': median(run['prewarm_s'] for run in imports),
+        'import_rss_mb': median(megabytes(run['import_rss_kb']) for run in imports),
+        'prewarm_rss_mb': median(megabytes(run['prewarm_rss_kb']) for run in imports),
+        'accepting_s': median(accepting for accepting, _, _ in servers),
+        'ready_s': median(ready for _, ready, _ in servers),
+        'ready_rss_mb': median(megabytes(rss) for _, _, rss in servers),
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    print(f"Compared with {baseline_path}:")
+    for key in ('main_import_ms', 'import_s', 'ready_s', 'import_rss_mb', 'ready_rss_mb'):
+        if results.get(key) is None or not baseline.get(key):
+            continue
+        change = (results[key] / baseline[key] - 1) * 100
+        print(f"  {key}: {baseline[key]} -> {results[key]} ({change:+.1f}%)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for the API")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help="Slowest top-level imports to list")
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--output', default='startup_results.json')
+    parser.add_argument('--baseline', help="Earlier results file to compare against")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print("Benchmarking cold start...")
+    print("-" * 30)
+
+    results = run_benchmark(args)
+    print(f"import main (-X importtime): {results['main_import_ms']:.1f} ms")
+    for module in results['slowest_imports']:
+        print(f"  {module['module']:<30} {module['cumulative_ms']:8.1f} ms")
+    print(f"Import: {results['import_s'] * 1000:.0f} ms, RSS {format_mb(results['import_rss_mb'])}")
+    print(f"Prewarm: {results['prewarm_s'] * 1000:.0f} ms, RSS {format_mb(results['prewarm_rss_mb'])}")
+    accepting = f"{results['accepting_s'] * 1000:.0f} ms" if results['accepting_s'] is not None else "n/a"
+    print(f"uvicorn: accepting after {accepting}, ready after {results['ready_s'] * 1000:.0f} ms, "
+          f"RSS {format_mb(results['ready_rss_mb'])}")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print("-" * 30)
+    print(f"Results written to {args.output}")
+    if args.baseline:
+        compare(results, args.baseline)
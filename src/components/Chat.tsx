@@ -10,6 +10,7 @@ export default function Chat() {
   const { data: session, status } = useSession();
   const [message, setMessage] = useState('');
   const [response, setResponse] = useState('');
+  const [progress, setProgress] = useState('');
   const [loading, setLoading] = useState(false);
 
   // Add loading state
@@ -27,8 +28,10 @@ export default function Chat() {
     if (!message.trim() || !session?.accessToken) return;
 
     setLoading(true);
+    setResponse('');
+    setProgress('');
     try {
-      const res = await fetch('http://localhost:8000/api/chat', {
+      const res = await fetch('http://localhost:8000/api/chat/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -39,16 +42,56 @@ export default function Chat() {
         }),
       });
 
-      const data = await res.json();
-      setResponse(data.response);
+      if (!res.ok || !res.body) {
+        throw new Error(`Request failed with status ${res.status}`);
+      }
+
+      // Read Server-Sent Events as they arrive and render them incrementally
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop() ?? '';
+
+        for (const event of events) {
+          if (!event.startsWith('data: ')) continue;
+          handleEvent(JSON.parse(event.slice('data: '.length)));
+        }
+      }
     } catch (error) {
       console.error('Error:', error);
       setResponse('Error sending message');
     } finally {
+      setProgress('');
       setLoading(false);
     }
   };
 
+  const handleEvent = (event: { type: string; text: string }) => {
+    switch (event.type) {
+      case 'chunk':
+        setResponse((previous) => previous + event.text);
+        break;
+      case 'progress':
+        setProgress(event.text);
+        break;
+      case 'done':
+        if (event.text) setResponse(event.text);
+        setProgress('');
+        break;
+      case 'error':
+        setResponse(event.text);
+        setProgress('');
+        break;
+    }
+  };
+
   if (!session) {
     return null;
   }
@@ -69,6 +112,9 @@ export default function Chat() {
             {loading ? 'Sending...' : 'Send'}
           </Button>
         </div>
+        {progress && (
+          <p className="text-sm text-muted-foreground">{progress}</p>
+        )}
         {response && (
           <div className="p-4 bg-muted rounded-lg">
             <p className="text-sm font-medium">Response:</p>